@@ -1,19 +1,48 @@
-import base64
+import hmac
 from urllib.parse import unquote
 
-import requests
-from fastapi import APIRouter, Request
-from fastapi.responses import JSONResponse
-
-from auth.ebay_oauth import get_access_token
-from configs.config import EBAY_CLIENT_ID, EBAY_CLIENT_SECRET, EBAY_REDIRECT_URI
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import JSONResponse, Response
+
+from auth.ebay_oauth import exchange_authorization_code, get_access_token, get_token_stats
+from clients.ebay_metadata_client import get_category_cache_stats
+from clients.upload_ledger import get_upload_reaper_stats
+from configs.config import (
+    DEBUG_TOKEN,
+    EBAY_REDIRECT_URI,
+    TELEGRAM_WEBHOOK_PATH,
+    TELEGRAM_WEBHOOK_SECRET,
+    TELEGRAM_WEBHOOK_URL,
+)
+from handlers.publish_queue import publish_queue
+from helpers.ai_helper import get_analysis_cache_stats
+from telegram_bot import (
+    bot_leadership,
+    feed_webhook_update,
+    get_update_stats,
+    leader_metrics,
+    leader_stats,
+    leader_trace,
+    leader_traces,
+)
+from utils.metrics import CONTENT_TYPE_LATEST, register_stats
+from utils.rate_limit import get_rate_limit_stats
 
 router = APIRouter()
 
+register_stats("ebay_oauth", get_token_stats)
+register_stats("category_cache", get_category_cache_stats)
+register_stats("ai_cache", get_analysis_cache_stats)
+register_stats("rate_limit", get_rate_limit_stats, label="dependency")
+register_stats("bot_leader", bot_leadership.stats)
+register_stats("publish_queue", publish_queue.stats)
+register_stats("updates", get_update_stats)
+register_stats("upload_reaper", get_upload_reaper_stats)
+
 
 @router.get("/ebay/token")
-def fetch_token():
-    token, expires_at = get_access_token()
+async def fetch_token():
+    token, expires_at = await get_access_token()
     return {"access_token": token, "expires_at": expires_at}
 
 
@@ -22,25 +51,80 @@ def health_check():
     return {"status": "ok"}
 
 
-@router.get("/callback")
-def callback(code: str = None):
-    if not code:
-        return JSONResponse(content={"error": "Missing authorization code"}, status_code=400)
+def _debug_denied(debug_token: str):
+    if not DEBUG_TOKEN:
+        return JSONResponse(content={"error": "Debug endpoints are disabled"}, status_code=404)
+    if not hmac.compare_digest(debug_token.encode(), DEBUG_TOKEN.encode()):
+        return JSONResponse(content={"error": "Invalid debug token"}, status_code=403)
+    return None
+
+
+# Handlers that read live in-memory state are async so they run on the event loop thread that
+# mutates it, instead of FastAPI's threadpool. State owned by the bot is read from the leader.
+@router.get("/stats")
+async def stats(debug_token: str = Header("", alias="X-Debug-Token")):
+    denied = _debug_denied(debug_token)
+    if denied:
+        return denied
+    return {
+        "ebay_oauth": get_token_stats(),
+        "category_cache": get_category_cache_stats(),
+        "ai_cache": get_analysis_cache_stats(),
+        "rate_limits": get_rate_limit_stats(),
+        "bot_leader": bot_leadership.stats(),
+        **await leader_stats(),
+    }
 
-    auth = base64.b64encode(f"{EBAY_CLIENT_ID}:{EBAY_CLIENT_SECRET}".encode()).decode()
 
-    headers = {
-        "Content-Type": "application/x-www-form-urlencoded",
-        "Authorization": f"Basic {auth}"
-    }
+@router.get("/metrics")
+async def metrics():
+    return Response(content=await leader_metrics(), media_type=CONTENT_TYPE_LATEST)
 
-    data = {
-        "grant_type": "authorization_code",
-        "code": unquote(code),
-        "redirect_uri": EBAY_REDIRECT_URI
-    }
 
-    response = requests.post("https://api.ebay.com/identity/v1/oauth2/token", headers=headers, data=data)
+@router.get("/debug/traces")
+async def list_traces(limit: int = 50, debug_token: str = Header("", alias="X-Debug-Token")):
+    denied = _debug_denied(debug_token)
+    if denied:
+        return denied
+    return {"traces": await leader_traces(limit)}
+
+
+@router.get("/debug/traces/{trace_id}")
+async def get_trace(trace_id: str, debug_token: str = Header("", alias="X-Debug-Token")):
+    denied = _debug_denied(debug_token)
+    if denied:
+        return denied
+    trace = await leader_trace(trace_id)
+    if trace is None:
+        return JSONResponse(content={"error": "Unknown trace id"}, status_code=404)
+    return trace
+
+
+@router.post(TELEGRAM_WEBHOOK_PATH)
+async def telegram_webhook(
+    request: Request,
+    secret_token: str = Header("", alias="X-Telegram-Bot-Api-Secret-Token"),
+):
+    if not TELEGRAM_WEBHOOK_URL:
+        return JSONResponse(content={"error": "Webhook mode is disabled"}, status_code=404)
+    if not hmac.compare_digest(secret_token.encode(), TELEGRAM_WEBHOOK_SECRET.encode()):
+        return JSONResponse(content={"error": "Invalid secret token"}, status_code=403)
+    try:
+        payload = await request.json()
+    except ValueError:
+        return JSONResponse(content={"error": "Invalid JSON"}, status_code=400)
+    if not await feed_webhook_update(payload):
+        # Telegram retries the delivery later.
+        return JSONResponse(content={"error": "Bot is not running"}, status_code=503)
+    return {"status": "ok"}
+
+
+@router.get("/callback")
+async def callback(code: str = None):
+    if not code:
+        return JSONResponse(content={"error": "Missing authorization code"}, status_code=400)
+
+    response = await exchange_authorization_code(unquote(code), EBAY_REDIRECT_URI)
 
     if response.status_code != 200:
         print("OAuth error (authorization_code):", response.status_code, response.text)
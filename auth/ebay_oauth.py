@@ -1,43 +1,182 @@
+import asyncio
 import base64
+import contextlib
 import logging
 import time
-import requests
-from configs.config import EBAY_CLIENT_ID, EBAY_CLIENT_SECRET, EBAY_REFRESH_TOKEN, EBAY_OAUTH_SCOPE, EBAY_OAUTH_URL
+from typing import Optional
+
+from clients.http_client import get_http_client
+from configs.config import (
+    EBAY_CLIENT_ID,
+    EBAY_CLIENT_SECRET,
+    EBAY_OAUTH_SCOPE,
+    EBAY_OAUTH_URL,
+    EBAY_REFRESH_TOKEN,
+    EBAY_TOKEN_REFRESH_MARGIN,
+)
+from utils.disk_cache import DiskCache
+from utils.metrics import timed_stage
+
+_TOKEN_CACHE_KEY = "access_token"
+_token_cache = DiskCache("ebay_oauth")
 
 _access_token = None
 _expires_at = 0  # timestamp
 
+_refresh_task: Optional[asyncio.Task] = None
+_refresher_task: Optional[asyncio.Task] = None
+_stats = {
+    "refreshes": 0,
+    "failures": 0,
+    "coalesced_waits": 0,
+    "background_refreshes": 0,
+    "last_refresh_seconds": None,
+    "total_refresh_seconds": 0.0,
+}
 
-def _request_new_access_token():
-    global _access_token, _expires_at
+
+def _basic_auth_headers():
     auth = base64.b64encode(f"{EBAY_CLIENT_ID}:{EBAY_CLIENT_SECRET}".encode()).decode()
-    headers = {
+    return {
         "Content-Type": "application/x-www-form-urlencoded",
         "Authorization": f"Basic {auth}"
     }
+
+
+async def _request_new_access_token():
+    global _access_token, _expires_at
     data = {
         "grant_type": "refresh_token",
         "refresh_token": EBAY_REFRESH_TOKEN,
         "scope": EBAY_OAUTH_SCOPE
     }
 
-    resp = requests.post(EBAY_OAUTH_URL, headers=headers, data=data, timeout=15)
+    started = time.perf_counter()
+    try:
+        with timed_stage("ebay_token_refresh"):
+            resp = await get_http_client().post(
+                EBAY_OAUTH_URL, headers=_basic_auth_headers(), data=data, timeout=15
+            )
 
-    if resp.status_code != 200:
-        print("OAuth error (refresh_token):", resp.status_code, resp.text)
-        resp.raise_for_status()
+            if resp.status_code != 200:
+                print("OAuth error (refresh_token):", resp.status_code, resp.text)
+                resp.raise_for_status()
+
+            tokens = resp.json()
+    except Exception:
+        _stats["failures"] += 1
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        _stats["last_refresh_seconds"] = round(elapsed, 3)
+        _stats["total_refresh_seconds"] += elapsed
 
-    tokens = resp.json()
     _access_token = tokens["access_token"]
     expires_in = tokens.get("expires_in", 7200)
     _expires_at = int(time.time()) + expires_in - 60
+    _stats["refreshes"] += 1
+    _store_cached_token()
     logging.info(f"New eBay access token received, valid {expires_in} sec")
     return _access_token, _expires_at
 
 
-def get_access_token():
+def _load_cached_token():
     global _access_token, _expires_at
+    cached = _token_cache.get(_TOKEN_CACHE_KEY)
+    if not cached or cached.get("expires_at", 0) <= int(time.time()):
+        return
+    _access_token = cached["access_token"]
+    _expires_at = cached["expires_at"]
+    logging.info("Loaded cached eBay access token, valid %s sec", _expires_at - int(time.time()))
+
+
+def _store_cached_token():
+    ttl = _expires_at - int(time.time())
+    if ttl > 0:
+        _token_cache.set(_TOKEN_CACHE_KEY, {"access_token": _access_token, "expires_at": _expires_at}, ttl=ttl)
+
+
+_load_cached_token()
+
+
+def _refresh_single_flight() -> asyncio.Task:
+    """
+    Returns the in-flight refresh task, starting one if none is running, so concurrent callers share it.
+    """
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_request_new_access_token())
+        _refresh_task.add_done_callback(_consume_refresh_error)
+    else:
+        _stats["coalesced_waits"] += 1
+    return _refresh_task
+
+
+def _consume_refresh_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        logging.warning("eBay token refresh failed: %s", task.exception())
+
+
+def _needs_proactive_refresh(now: int) -> bool:
+    return _expires_at - now <= EBAY_TOKEN_REFRESH_MARGIN
+
+
+async def get_access_token():
     now = int(time.time())
     if _access_token and now < _expires_at:
+        if _needs_proactive_refresh(now) and (_refresh_task is None or _refresh_task.done()):
+            _stats["background_refreshes"] += 1
+            _refresh_single_flight()
         return _access_token, _expires_at
-    return _request_new_access_token()
+    return await asyncio.shield(_refresh_single_flight())
+
+
+async def _refresh_loop():
+    while True:
+        now = int(time.time())
+        delay = _expires_at - now - EBAY_TOKEN_REFRESH_MARGIN if _access_token else 0
+        await asyncio.sleep(max(delay, 5))
+        if _access_token and not _needs_proactive_refresh(int(time.time())):
+            continue
+        _stats["background_refreshes"] += 1
+        with contextlib.suppress(Exception):
+            await asyncio.shield(_refresh_single_flight())
+
+
+def start_token_refresher():
+    """
+    Keeps the access token fresh in the background so request handlers never wait for OAuth.
+    """
+    global _refresher_task
+    if _refresher_task is None or _refresher_task.done():
+        _refresher_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_token_refresher():
+    global _refresher_task
+    if _refresher_task is None:
+        return
+    _refresher_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await _refresher_task
+    _refresher_task = None
+
+
+def get_token_stats():
+    refreshes = _stats["refreshes"] + _stats["failures"]
+    average = _stats["total_refresh_seconds"] / refreshes if refreshes else None
+    return {
+        **_stats,
+        "total_refresh_seconds": round(_stats["total_refresh_seconds"], 3),
+        "average_refresh_seconds": round(average, 3) if average is not None else None,
+        "expires_in": max(_expires_at - int(time.time()), 0) if _access_token else 0,
+    }
+
+
+async def exchange_authorization_code(code: str, redirect_uri: str):
+    data = {
+        "grant_type": "authorization_code",
+        "code": code,
+        "redirect_uri": redirect_uri
+    }
+    return await get_http_client().post(EBAY_OAUTH_URL, headers=_basic_auth_headers(), data=data)
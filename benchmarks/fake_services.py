@@ -0,0 +1,399 @@
+"""
+Local stand-ins for every external service the bot talks to, served by one FastAPI app:
+
+    /ebay        OAuth token, Taxonomy (tree id, category suggestions), Inventory (items, offers, bulk)
+    /openai/v1   chat completions, plain and streamed (SSE)
+    /cloudinary  upload, destroy and the Admin API delete_resources
+    /telegram    Bot API methods and file downloads
+
+Each service gets a Fault: a fixed latency plus uniform jitter before every response, and an
+error rate at which a request is answered with error_status instead.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+SERVICES = ("ebay", "openai", "cloudinary", "telegram")
+
+
+@dataclass
+class Fault:
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+
+
+@dataclass
+class ServiceStats:
+    requests: int = 0
+    injected_errors: int = 0
+    by_endpoint: Dict[str, int] = field(default_factory=dict)
+
+
+class FakeServices:
+    """
+    Runs the fake services on host:port in a background thread with its own event loop.
+    """
+
+    def __init__(self, host: str, port: int, faults: Dict[str, Fault], seed: Optional[int] = None) -> None:
+        self.host = host
+        self.port = port
+        self.faults = faults
+        self.stats = {service: ServiceStats() for service in SERVICES}
+        # Called from the server thread with (chat_id, text) for every message the bot sends or edits.
+        self.on_message: Optional[Callable[[int, str], None]] = None
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._files: Dict[str, bytes] = {}
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self.app = self._build_app()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def register_file(self, file_id: str, data: bytes):
+        self._files[file_id] = data
+
+    def start(self, timeout: float = 10.0):
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="fake-services", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"Fake services did not start on {self.base_url}")
+            time.sleep(0.05)
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def report(self) -> Dict[str, dict]:
+        return {
+            service: {
+                "requests": stats.requests,
+                "injected_errors": stats.injected_errors,
+                "by_endpoint": dict(sorted(stats.by_endpoint.items())),
+            }
+            for service, stats in self.stats.items()
+        }
+
+    def _next_id(self) -> int:
+        return next(self._ids)
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.middleware("http")
+        async def inject_faults(request: Request, call_next):
+            service = request.url.path.strip("/").split("/", 1)[0]
+            fault = self.faults.get(service)
+            stats = self.stats.get(service)
+            if stats is not None:
+                stats.requests += 1
+            if fault is not None:
+                delay = fault.latency + self._random.uniform(0, fault.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if fault.error_rate and self._random.random() < fault.error_rate:
+                    stats.injected_errors += 1
+                    # One body that every client library understands as an error.
+                    return JSONResponse(
+                        status_code=fault.error_status,
+                        content={
+                            "ok": False,
+                            "error_code": fault.error_status,
+                            "description": "Injected failure",
+                            "error": {"message": "Injected failure"},
+                            "errors": [{"errorId": 0, "message": "Injected failure"}],
+                        },
+                    )
+            return await call_next(request)
+
+        self._add_ebay_routes(app)
+        self._add_openai_routes(app)
+        self._add_cloudinary_routes(app)
+        self._add_telegram_routes(app)
+        return app
+
+    def _count(self, service: str, endpoint: str):
+        by_endpoint = self.stats[service].by_endpoint
+        by_endpoint[endpoint] = by_endpoint.get(endpoint, 0) + 1
+
+    # eBay -----------------------------------------------------------------------------------------
+
+    def _add_ebay_routes(self, app: FastAPI):
+        @app.post("/ebay/identity/v1/oauth2/token")
+        async def oauth_token():
+            self._count("ebay", "oauth_token")
+            return {"access_token": "bench-access-token", "expires_in": 7200, "token_type": "User Access Token"}
+
+        @app.get("/ebay/commerce/taxonomy/v1/get_default_category_tree_id")
+        async def default_category_tree_id():
+            self._count("ebay", "get_default_category_tree_id")
+            return {"categoryTreeId": "0", "categoryTreeVersion": "bench"}
+
+        @app.get("/ebay/commerce/taxonomy/v1/category_tree/{tree_id}/get_category_suggestions")
+        async def category_suggestions(tree_id: str, q: str = ""):
+            self._count("ebay", "get_category_suggestions")
+            return {
+                "categorySuggestions": [
+                    {"category": {"categoryId": "179753", "categoryName": "Bench Category"}, "categoryTreeNodeLevel": 3}
+                ]
+            }
+
+        @app.get("/ebay/sell/inventory/v1/location")
+        async def locations():
+            self._count("ebay", "location")
+            return {"locations": [{"merchantLocationKey": "BENCH"}]}
+
+        @app.put("/ebay/sell/inventory/v1/inventory_item/{sku}")
+        async def inventory_item(sku: str):
+            self._count("ebay", "inventory_item")
+            return Response(status_code=204)
+
+        @app.post("/ebay/sell/inventory/v1/offer")
+        async def create_offer():
+            self._count("ebay", "create_offer")
+            return JSONResponse(status_code=201, content={"offerId": str(self._next_id())})
+
+        @app.get("/ebay/sell/inventory/v1/offer")
+        async def get_offers(sku: str = ""):
+            self._count("ebay", "get_offers")
+            return {"offers": [], "total": 0}
+
+        @app.put("/ebay/sell/inventory/v1/offer/{offer_id}")
+        async def update_offer(offer_id: str):
+            self._count("ebay", "update_offer")
+            return Response(status_code=204)
+
+        @app.post("/ebay/sell/inventory/v1/offer/{offer_id}/publish")
+        async def publish_offer(offer_id: str):
+            self._count("ebay", "publish_offer")
+            return {"listingId": f"11{self._next_id():010d}"}
+
+        @app.post("/ebay/sell/inventory/v1/bulk_create_or_replace_inventory_item")
+        async def bulk_inventory(request: Request):
+            self._count("ebay", "bulk_create_or_replace_inventory_item")
+            requests = (await request.json()).get("requests") or []
+            return {"responses": [{"sku": item.get("sku"), "statusCode": 200} for item in requests]}
+
+        @app.post("/ebay/sell/inventory/v1/bulk_create_offer")
+        async def bulk_offer(request: Request):
+            self._count("ebay", "bulk_create_offer")
+            requests = (await request.json()).get("requests") or []
+            return {
+                "responses": [
+                    {"sku": item.get("sku"), "statusCode": 200, "offerId": str(self._next_id())} for item in requests
+                ]
+            }
+
+        @app.post("/ebay/sell/inventory/v1/bulk_publish_offer")
+        async def bulk_publish(request: Request):
+            self._count("ebay", "bulk_publish_offer")
+            requests = (await request.json()).get("requests") or []
+            return {
+                "responses": [
+                    {"offerId": item.get("offerId"), "statusCode": 200, "listingId": f"11{self._next_id():010d}"}
+                    for item in requests
+                ]
+            }
+
+    # OpenAI ---------------------------------------------------------------------------------------
+
+    def _add_openai_routes(self, app: FastAPI):
+        @app.post("/openai/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            content = json.dumps(self._fake_listing())
+            completion_id = f"chatcmpl-bench-{self._next_id()}"
+            created = int(time.time())
+            model = body.get("model", "bench")
+            if not body.get("stream"):
+                self._count("openai", "chat_completions")
+                return {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                    ],
+                    "usage": {"prompt_tokens": 1000, "completion_tokens": 300, "total_tokens": 1300},
+                }
+
+            self._count("openai", "chat_completions_stream")
+
+            def chunk(delta: dict, finish_reason: Optional[str] = None) -> str:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+                return f"data: {json.dumps(payload)}\n\n"
+
+            async def events():
+                yield chunk({"role": "assistant", "content": ""})
+                for start in range(0, len(content), 24):
+                    yield chunk({"content": content[start : start + 24]})
+                yield chunk({}, "stop")
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+    def _fake_listing(self) -> dict:
+        number = self._next_id()
+        # Unique titles keep the category cache from hiding the Taxonomy calls.
+        return {
+            "brand": "Benchmark",
+            "model": f"B-{number}",
+            "title": f"Benchmark B-{number} Motorcycle Part",
+            "category_hint": "Motorcycle Parts",
+            "product_type": "Motorcycle Part",
+            "condition": "Used",
+            "estimated_weight_kg": round(self._random.uniform(0.2, 8.0), 2),
+            "weight_class": None,
+            "material": "Aluminium",
+            "color": "Black",
+            "mpn": f"MPN-{number}",
+            "included_items": "Part only",
+            "features": ["Lightweight", "Direct fit", "Tested"],
+            "description": "A used benchmark part in good condition.",
+            "tags": ["benchmark", "motorcycle"],
+        }
+
+    # Cloudinary -----------------------------------------------------------------------------------
+
+    def _add_cloudinary_routes(self, app: FastAPI):
+        @app.post("/cloudinary/v1_1/{cloud_name}/image/upload")
+        async def upload(cloud_name: str, request: Request):
+            self._count("cloudinary", "upload")
+            size = len(await request.body())
+            public_id = f"bench/{self._next_id()}"
+            return {
+                "public_id": public_id,
+                "version": 1,
+                "format": "jpg",
+                "resource_type": "image",
+                "bytes": size,
+                "secure_url": f"{self.base_url}/cloudinary/{cloud_name}/image/upload/v1/{public_id}.jpg",
+            }
+
+        @app.post("/cloudinary/v1_1/{cloud_name}/image/destroy")
+        async def destroy(cloud_name: str):
+            self._count("cloudinary", "destroy")
+            return {"result": "ok"}
+
+        @app.delete("/cloudinary/v1_1/{cloud_name}/resources/image/upload")
+        async def delete_resources(cloud_name: str, request: Request):
+            self._count("cloudinary", "delete_resources")
+            pairs = list(request.query_params.multi_items()) + parse_qsl((await request.body()).decode(errors="ignore"))
+            public_ids = [value for key, value in pairs if key.startswith("public_ids")]
+            return {"deleted": {public_id: "deleted" for public_id in public_ids}, "partial": False}
+
+    # Telegram -------------------------------------------------------------------------------------
+
+    def _add_telegram_routes(self, app: FastAPI):
+        @app.get("/telegram/file/bot{token}/{file_path:path}")
+        async def download(token: str, file_path: str):
+            self._count("telegram", "download")
+            file_id = file_path.rsplit("/", 1)[-1].split(".", 1)[0]
+            data = self._files.get(file_id)
+            if data is None:
+                return JSONResponse(status_code=404, content={"ok": False, "description": "Not Found"})
+            return Response(content=data, media_type="image/jpeg")
+
+        @app.post("/telegram/bot{token}/{method}")
+        async def bot_method(token: str, method: str, request: Request):
+            self._count("telegram", method)
+            params = await _form_params(request)
+            return {"ok": True, "result": self._telegram_result(method, params)}
+
+    def _telegram_result(self, method: str, params: Dict[str, str]):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        if method == "getFile":
+            file_id = params.get("file_id", "")
+            return {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "file_size": len(self._files.get(file_id, b"")),
+                "file_path": f"photos/{file_id}.jpg",
+            }
+        if method in ("sendMessage", "editMessageText"):
+            chat_id = int(params.get("chat_id", 0))
+            text = params.get("text", "")
+            if self.on_message is not None:
+                self.on_message(chat_id, text)
+            return {
+                "message_id": int(params.get("message_id") or self._next_id()),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": 1, "is_bot": True, "first_name": "Bench"},
+                "text": text,
+            }
+        return True
+
+
+async def _form_params(request: Request) -> Dict[str, str]:
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/json"):
+        return {key: str(value) for key, value in json.loads(body or b"{}").items()}
+    return dict(parse_qsl(body.decode(errors="ignore")))
+
+
+def parse_service_values(spec: str) -> Dict[str, float]:
+    """
+    Parses "ebay=0.2,openai=1.5" (a bare number applies to every service).
+    """
+    values: Dict[str, float] = {}
+    for part in filter(None, (item.strip() for item in spec.split(","))):
+        if "=" in part:
+            service, value = part.split("=", 1)
+            if service not in SERVICES:
+                raise ValueError(f"Unknown service '{service}' (expected one of {', '.join(SERVICES)})")
+            values[service] = float(value)
+        else:
+            values.update({service: float(part) for service in SERVICES})
+    return values
+
+
+def build_faults(latency: str, jitter: str, error_rate: str, error_status: int) -> Dict[str, Fault]:
+    latencies = parse_service_values(latency)
+    jitters = parse_service_values(jitter)
+    error_rates = parse_service_values(error_rate)
+    return {
+        service: Fault(
+            latency=latencies.get(service, 0.0),
+            jitter=jitters.get(service, 0.0),
+            error_rate=error_rates.get(service, 0.0),
+            error_status=error_status,
+        )
+        for service in SERVICES
+    }
+
+
+def describe_faults(faults: Dict[str, Fault]) -> List[str]:
+    return [
+        f"{service}: latency={fault.latency:.3f}s jitter={fault.jitter:.3f}s errors={fault.error_rate:.1%}"
+        for service, fault in faults.items()
+    ]
@@ -0,0 +1,372 @@
+"""
+End-to-end benchmark of the listing flow against the local fake services (no real eBay, OpenAI,
+Cloudinary or Telegram traffic).
+
+    python -m benchmarks.listing_flow --users 8 --listings-per-user 5 --photos 2 \\
+        --latency telegram=0.05,cloudinary=0.3,ebay=0.15,openai=2 --error-rate ebay=0.02
+
+Every simulated user sends /start, answers the profile questions, then for each listing sends its
+photos, waits for the price prompt, sends a price and waits for the publish result. Updates enter
+through feed_webhook_update (the webhook route's path) and run through the real handlers, rate
+limiters, publish queue and clients. The bot's own settings (rate limits, queue workers, streaming,
+...) are read from the environment as usual; endpoints, credentials and state files are overridden.
+
+Reports listings/sec, end-to-end latency and p50/p95/p99 per stage, taken from the listing traces.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+from PIL import Image
+
+from benchmarks.fake_services import FakeServices, build_faults, describe_faults
+
+PROFILE_ANSWERS = ["Benchmark part", "skip", "skip", "Used", "skip", "Black", "skip"]
+PRICE_PROMPT = "enter the price"
+PHOTO_PROMPT = "send photo"
+SUCCESS = "Successfully published"
+FAILURES = ("Failed to", "Couldn't", "Missing listing data", "internal error", "queue is full")
+
+
+@dataclass
+class ListingResult:
+    user_id: int
+    outcome: str  # published, failed or timeout
+    started: float
+    price_prompt_after: Optional[float] = None
+    finished_after: Optional[float] = None
+    detail: str = ""
+
+
+class SimulatedUser:
+    def __init__(self, user_id: int, timeout: float) -> None:
+        self.user_id = user_id
+        self.timeout = timeout
+        self.inbox: asyncio.Queue = asyncio.Queue()
+
+    async def expect(self, predicate: Callable[[str], bool]) -> Optional[str]:
+        """
+        Waits for a bot message matching predicate or a failure message; None on timeout.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                text = await asyncio.wait_for(self.inbox.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return None
+            if predicate(text) or _is_failure(text):
+                return text
+
+
+class UpdateFactory:
+    def __init__(self) -> None:
+        self._update_id = 0
+        self._message_id = 0
+
+    def text(self, user_id: int, text: str) -> dict:
+        message = self._message(user_id)
+        message["text"] = text
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return self._update(message)
+
+    def photo(self, user_id: int, file_id: str, size: int, media_group_id: Optional[str]) -> dict:
+        message = self._message(user_id)
+        message["photo"] = [
+            {"file_id": file_id, "file_unique_id": file_id, "width": 1000, "height": 750, "file_size": size}
+        ]
+        if media_group_id:
+            message["media_group_id"] = media_group_id
+        return self._update(message)
+
+    def _message(self, user_id: int) -> dict:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"Bench {user_id}"},
+        }
+
+    def _update(self, message: dict) -> dict:
+        self._update_id += 1
+        return {"update_id": self._update_id, "message": message}
+
+
+def _is_failure(text: str) -> bool:
+    return any(marker in text for marker in FAILURES)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _make_photo(rng: random.Random, side: int) -> bytes:
+    # Smooth random blobs: distinct images (no dedup or analysis cache hits) at a realistic JPEG size.
+    seed = Image.frombytes("RGB", (8, 6), bytes(rng.getrandbits(8) for _ in range(8 * 6 * 3)))
+    image = seed.resize((side, side * 3 // 4), Image.BICUBIC)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _configure_environment(services: FakeServices, work_dir: str, args: argparse.Namespace):
+    base = services.base_url
+    os.environ.update(
+        {
+            "EBAY_CLIENT_ID": "bench",
+            "EBAY_CLIENT_SECRET": "bench",
+            "EBAY_REFRESH_TOKEN": "bench",
+            "EBAY_REDIRECT_URI": "bench",
+            "OPENAI_API_KEY": "bench",
+            "TELEGRAM_BOT_TOKEN": "123456:BENCH",
+            "CLOUDINARY_CLOUD_NAME": "bench",
+            "CLOUDINARY_API_KEY": "bench",
+            "CLOUDINARY_API_SECRET": "bench",
+            "EBAY_API_BASE_URL": f"{base}/ebay",
+            "OPENAI_BASE_URL": f"{base}/openai/v1",
+            "CLOUDINARY_UPLOAD_PREFIX": f"{base}/cloudinary",
+            "TELEGRAM_API_BASE_URL": f"{base}/telegram",
+            "TELEGRAM_WEBHOOK_URL": f"{base}/bench",
+            "TELEGRAM_WEBHOOK_SECRET": "bench",
+            "CACHE_DB_PATH": os.path.join(work_dir, "cache.sqlite3"),
+            "BOT_STATE_DB_PATH": os.path.join(work_dir, "bot_state.sqlite3") if args.persistence else "",
+            "BOT_LEADER_LOCK_PATH": os.path.join(work_dir, "bot_leader.lock"),
+            "BOT_LEADER_SOCKET_PATH": os.path.join(work_dir, "bot_leader.sock"),
+            "CATEGORY_INDEX_ENABLED": "false",
+            "CATEGORY_INDEX_PATH": os.path.join(work_dir, "category_tree.json.gz"),
+            "TRACE_ENABLED": "true",
+            "TRACE_BUFFER_SIZE": str(args.users * args.listings_per_user + args.users),
+            "TRACE_EXPORT_PATH": args.trace_export or "",
+        }
+    )
+    if args.streaming is not None:
+        os.environ["AI_STREAMING"] = "true" if args.streaming else "false"
+
+
+async def _run_user(
+    user: SimulatedUser,
+    factory: UpdateFactory,
+    photos: List[List[str]],
+    sizes: Dict[str, int],
+    feed,
+    results: List[ListingResult],
+):
+    uid = user.user_id
+    started = time.perf_counter()
+    await feed(factory.text(uid, "/start"))
+    for answer in PROFILE_ANSWERS:
+        await feed(factory.text(uid, answer))
+    text = await user.expect(lambda message: PHOTO_PROMPT in message.lower())
+    if text is None or _is_failure(text):
+        results.append(ListingResult(uid, "timeout" if text is None else "failed", started, detail=text or "setup"))
+        return
+
+    for index, file_ids in enumerate(photos):
+        started = time.perf_counter()
+        result = ListingResult(uid, "timeout", started)
+        results.append(result)
+        group = f"bench-{uid}-{index}" if len(file_ids) > 1 else None
+        for file_id in file_ids:
+            await feed(factory.photo(uid, file_id, sizes[file_id], group))
+        text = await user.expect(lambda message: PRICE_PROMPT in message)
+        if text is None or _is_failure(text):
+            result.outcome, result.detail = ("timeout", "price prompt") if text is None else ("failed", text)
+            return
+        result.price_prompt_after = time.perf_counter() - started
+
+        await feed(factory.text(uid, f"{19.99 + index:.2f}"))
+        text = await user.expect(lambda message: SUCCESS in message)
+        if text is None:
+            result.detail = "publish result"
+            return
+        result.finished_after = time.perf_counter() - started
+        if _is_failure(text):
+            result.outcome, result.detail = "failed", text
+            return
+        result.outcome = "published"
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(percent / 100 * len(ordered)) - 1))]
+
+
+def _summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "p50": _percentile(values, 50),
+        "p95": _percentile(values, 95),
+        "p99": _percentile(values, 99),
+        "max": max(values),
+    }
+
+
+def _stage_durations(trace_buffer) -> Dict[str, List[float]]:
+    durations: Dict[str, List[float]] = {}
+    for trace in trace_buffer.recent(sys.maxsize):
+        for span in trace.spans:
+            if span.duration is not None:
+                durations.setdefault(span.name, []).append(span.duration)
+    return durations
+
+
+async def _benchmark(args: argparse.Namespace, services: FakeServices) -> dict:
+    # Imported only now: configuration is read from the environment at import time.
+    import telegram_bot
+    from clients.http_client import close_http_client
+    from utils.image_util import shutdown_image_workers, start_image_workers
+    from utils.rate_limit import get_rate_limit_stats
+    from utils.tracing import trace_buffer
+
+    rng = random.Random(args.seed)
+    loop = asyncio.get_running_loop()
+    users = [SimulatedUser(10_000 + index, args.timeout) for index in range(args.users)]
+    inboxes = {user.user_id: user.inbox for user in users}
+    services.on_message = lambda chat_id, text: (
+        loop.call_soon_threadsafe(inboxes[chat_id].put_nowait, text) if chat_id in inboxes else None
+    )
+
+    sizes: Dict[str, int] = {}
+    plans: Dict[int, List[List[str]]] = {}
+    for user in users:
+        plans[user.user_id] = []
+        for listing in range(args.listings_per_user):
+            file_ids = []
+            for photo in range(args.photos):
+                file_id = f"u{user.user_id}l{listing}p{photo}"
+                data = _make_photo(rng, args.image_side)
+                services.register_file(file_id, data)
+                sizes[file_id] = len(data)
+                file_ids.append(file_id)
+            plans[user.user_id].append(file_ids)
+
+    async def feed(payload: dict):
+        if not await telegram_bot.feed_webhook_update(payload):
+            raise RuntimeError("The bot did not accept an update")
+
+    start_image_workers()
+    await telegram_bot.start_bot()
+    results: List[ListingResult] = []
+    factory = UpdateFactory()
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(_run_user(user, factory, plans[user.user_id], sizes, feed, results) for user in users)
+        )
+        wall = time.perf_counter() - started
+    finally:
+        await telegram_bot.stop_bot()
+        await close_http_client()
+        shutdown_image_workers()
+
+    published = [result for result in results if result.outcome == "published"]
+    stages = {"listing (end to end)": [result.finished_after for result in published]}
+    stages["photos -> price prompt"] = [
+        result.price_prompt_after for result in results if result.price_prompt_after is not None
+    ]
+    stages.update(sorted(_stage_durations(trace_buffer).items()))
+    return {
+        "users": args.users,
+        "listings": len(results),
+        "published": len(published),
+        "failed": sum(1 for result in results if result.outcome == "failed"),
+        "timed_out": sum(1 for result in results if result.outcome == "timeout"),
+        "wall_seconds": wall,
+        "listings_per_second": len(published) / wall if wall else 0.0,
+        "stages": {name: _summarize(values) for name, values in stages.items() if values},
+        "rate_limits": get_rate_limit_stats(),
+        "services": services.report(),
+        "failures": [asdict(result) for result in results if result.outcome != "published"][:20],
+    }
+
+
+def _print_report(report: dict, faults):
+    print("Fake services:")
+    for line in describe_faults(faults):
+        print(f"  {line}")
+    print(
+        f"\n{report['published']}/{report['listings']} listings published "
+        f"({report['failed']} failed, {report['timed_out']} timed out) by {report['users']} users "
+        f"in {report['wall_seconds']:.2f}s: {report['listings_per_second']:.2f} listings/sec\n"
+    )
+    print(f"{'stage':<32}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, summary in report["stages"].items():
+        print(
+            f"{name:<32}{summary['count']:>7}{summary['p50']:>9.3f}s{summary['p95']:>9.3f}s"
+            f"{summary['p99']:>9.3f}s{summary['max']:>9.3f}s"
+        )
+    print("\nRequests served:")
+    for service, stats in report["services"].items():
+        print(f"  {service:<12}{stats['requests']:>7} ({stats['injected_errors']} injected errors)")
+    for failure in report["failures"][:5]:
+        print(f"  ! user {failure['user_id']}: {failure['outcome']} {failure['detail'][:120]}")
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=4, help="simulated users running concurrently")
+    parser.add_argument("--listings-per-user", type=int, default=3)
+    parser.add_argument("--photos", type=int, default=1, help="photos per listing (more than one is an album)")
+    parser.add_argument("--image-side", type=int, default=1200, help="width of the generated photos in pixels")
+    parser.add_argument(
+        "--latency",
+        default="telegram=0.05,cloudinary=0.3,ebay=0.15,openai=2.0",
+        help="seconds added to every response, per service (service=value,... or one value for all)",
+    )
+    parser.add_argument("--jitter", default="0.05", help="extra uniform random latency, same format")
+    parser.add_argument("--error-rate", default="0", help="share of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--timeout", type=float, default=180.0, help="seconds to wait for each bot reply")
+    parser.add_argument(
+        "--streaming", action=argparse.BooleanOptionalAction, default=None, help="override AI_STREAMING"
+    )
+    parser.add_argument("--persistence", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--port", type=int, default=0, help="port of the fake services (default: any free port)")
+    parser.add_argument("--json", dest="json_path", help="also write the full report to this file")
+    parser.add_argument("--trace-export", help="TRACE_EXPORT_PATH for the run (JSON lines)")
+    parser.add_argument("--keep-state", action="store_true", help="keep the temporary state directory")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+    faults = build_faults(args.latency, args.jitter, args.error_rate, args.error_status)
+    services = FakeServices("127.0.0.1", args.port or _free_port(), faults, seed=args.seed)
+    work_dir = tempfile.mkdtemp(prefix="moto-bot-bench-")
+    services.start()
+    try:
+        _configure_environment(services, work_dir, args)
+        report = asyncio.run(_benchmark(args, services))
+    finally:
+        services.stop()
+        if args.keep_state:
+            print(f"State kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    _print_report(report, faults)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,128 @@
+import asyncio
+import io
+import logging
+from typing import List, Optional
+
 import cloudinary
+import cloudinary.api
+import cloudinary.api_client.call_api
+import cloudinary.exceptions
 import cloudinary.uploader
+import cloudinary.utils
+
+from configs.config import (
+    CLOUDINARY_API_KEY,
+    CLOUDINARY_API_SECRET,
+    CLOUDINARY_CHUNKED_UPLOAD_THRESHOLD,
+    CLOUDINARY_CLOUD_NAME,
+    CLOUDINARY_MAX_CONCURRENCY,
+    CLOUDINARY_RATE_BURST,
+    CLOUDINARY_RATE_PER_SECOND,
+    CLOUDINARY_UPLOAD_CHUNK_SIZE,
+    CLOUDINARY_UPLOAD_PREFIX,
+    RATE_LIMIT_BASE_DELAY,
+    RATE_LIMIT_MAX_DELAY,
+    RATE_LIMIT_MAX_RETRIES,
+)
+from utils.rate_limit import Failure, RateLimiter
 
-from configs.config import CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET
+logger = logging.getLogger(__name__)
+
+DELETE_BATCH_SIZE = 100  # Admin API limit of public ids per delete_resources call
 
 cloudinary.config(
     cloud_name=CLOUDINARY_CLOUD_NAME,
     api_key=CLOUDINARY_API_KEY,
     api_secret=CLOUDINARY_API_SECRET
 )
+if CLOUDINARY_UPLOAD_PREFIX:
+    cloudinary.config(upload_prefix=CLOUDINARY_UPLOAD_PREFIX)
+
+if not cloudinary.uploader.is_appengine_sandbox():
+    # The SDK's urllib3 pools keep one connection per host; concurrent calls would open and drop extras.
+    _http = cloudinary.utils.get_http_connector(
+        cloudinary.config(), {**cloudinary.CERT_KWARGS, "maxsize": CLOUDINARY_MAX_CONCURRENCY}
+    )
+    cloudinary.uploader._http = _http
+    cloudinary.api_client.call_api._http = _http
+
+
+def _describe_cloudinary_error(exc: BaseException) -> Optional[Failure]:
+    # The SDK maps HTTP 420 (rate limited) and 5xx responses to these exception types.
+    if isinstance(exc, cloudinary.exceptions.RateLimited):
+        return Failure(429)
+    if isinstance(exc, cloudinary.exceptions.GeneralError):
+        return Failure(500)
+    return None
+
+
+cloudinary_limiter = RateLimiter(
+    "cloudinary",
+    rate=CLOUDINARY_RATE_PER_SECOND,
+    burst=CLOUDINARY_RATE_BURST,
+    max_concurrency=CLOUDINARY_MAX_CONCURRENCY,
+    max_retries=RATE_LIMIT_MAX_RETRIES,
+    base_delay=RATE_LIMIT_BASE_DELAY,
+    max_delay=RATE_LIMIT_MAX_DELAY,
+    describe_error=_describe_cloudinary_error,
+)
 
 
-def upload_image(temp_path: str):
-    return cloudinary.uploader.upload(temp_path)
+def upload_image(image: bytes | bytearray, filename: str = "photo"):
+    """
+    Uploads in-memory image bytes; payloads above the chunked threshold go through upload_large.
+    """
+    stream = io.BytesIO(image)
+    if len(image) > CLOUDINARY_CHUNKED_UPLOAD_THRESHOLD:
+        return cloudinary.uploader.upload_large(
+            stream,
+            filename=filename,
+            chunk_size=CLOUDINARY_UPLOAD_CHUNK_SIZE,
+        )
+    return cloudinary.uploader.upload(stream, filename=filename)
 
 
 def delete_image(public_id: str):
     cloudinary.uploader.destroy(public_id)
+
+
+async def upload_image_async(image: bytes | bytearray, filename: str = "photo"):
+    # A retried upload after a server error could store the photo twice, so only throttling is retried.
+    return await cloudinary_limiter.call(
+        lambda: asyncio.to_thread(upload_image, image, filename),
+        idempotent=False,
+    )
+
+
+async def delete_image_async(public_id: str):
+    await cloudinary_limiter.call(lambda: asyncio.to_thread(delete_image, public_id))
+
+
+async def delete_images_async(public_ids: List[str]) -> List[str]:
+    """
+    Deletes images with the Admin API's multi-id delete_resources (chunks of DELETE_BATCH_SIZE).
+    A chunk that fails there (e.g. Admin API quota) falls back to per-image destroy calls, whose
+    concurrency is bounded by cloudinary_limiter. Returns the ids that are gone afterwards.
+    """
+    chunks = [public_ids[i : i + DELETE_BATCH_SIZE] for i in range(0, len(public_ids), DELETE_BATCH_SIZE)]
+    results = await asyncio.gather(*(_delete_chunk(chunk) for chunk in chunks))
+    return [public_id for deleted in results for public_id in deleted]
+
+
+async def _delete_chunk(public_ids: List[str]) -> List[str]:
+    try:
+        response = await cloudinary_limiter.call(
+            lambda: asyncio.to_thread(cloudinary.api.delete_resources, public_ids)
+        )
+        statuses = response.get("deleted") or {}
+        return [public_id for public_id in public_ids if statuses.get(public_id) in ("deleted", "not_found")]
+    except Exception as exc:
+        logger.warning("Bulk delete of %d images failed, deleting one by one: %s", len(public_ids), exc)
+    results = await asyncio.gather(*(delete_image_async(public_id) for public_id in public_ids), return_exceptions=True)
+    deleted = []
+    for public_id, result in zip(public_ids, results):
+        if isinstance(result, BaseException):
+            logger.warning("Failed to delete Cloudinary image %s: %s", public_id, result)
+        else:
+            deleted.append(public_id)
+    return deleted
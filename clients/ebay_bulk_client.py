@@ -0,0 +1,201 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from clients.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+BULK_MAX_REQUESTS = 25
+BULK_LOCALE = "en_US"
+
+
+@dataclass
+class PendingListing:
+    sku: str
+    inventory_payload: Dict[str, Any]
+    offer_payload: Dict[str, Any]
+    submitted_by: Optional[int] = None
+    future: asyncio.Future = field(default=None, repr=False)
+
+
+def _format_errors(item: Dict[str, Any]) -> str:
+    errors = item.get("errors") or []
+    messages = [
+        str(error.get("longMessage") or error.get("message") or error.get("errorId"))
+        for error in errors
+    ]
+    return "; ".join(messages) if messages else "no error details"
+
+
+class BulkPublisher:
+    """
+    Accumulates ready listings and publishes them through the eBay bulk inventory endpoints.
+
+    Each submitted listing gets its own future, so callers keep the single-item contract:
+    they await one result string while the HTTP round trips are shared by the whole batch.
+    """
+
+    def __init__(
+        self,
+        headers_provider: Callable[[], Awaitable[Dict[str, str]]],
+        batch_size: int = BULK_MAX_REQUESTS,
+        flush_delay: float = 2.0,
+    ) -> None:
+        self._headers_provider = headers_provider
+        self._batch_size = max(1, min(batch_size, BULK_MAX_REQUESTS))
+        self._flush_delay = max(0.0, flush_delay)
+        self._pending: list[PendingListing] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._inflight: set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        sku: str,
+        inventory_payload: Dict[str, Any],
+        offer_payload: Dict[str, Any],
+        submitted_by: Optional[int] = None,
+    ) -> str:
+        listing = PendingListing(
+            sku=sku,
+            inventory_payload=inventory_payload,
+            offer_payload=offer_payload,
+            submitted_by=submitted_by,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._pending.append(listing)
+        if len(self._pending) >= self._batch_size:
+            self._start_flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_after_delay())
+        return await listing.future
+
+    async def _flush_after_delay(self):
+        await asyncio.sleep(self._flush_delay)
+        self._start_flush()
+
+    def _start_flush(self):
+        batch = self._pending[: self._batch_size]
+        self._pending = self._pending[self._batch_size :]
+        if not batch:
+            return
+        task = asyncio.create_task(self._publish_batch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        if self._pending and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_after_delay())
+
+    async def _publish_batch(self, batch: list[PendingListing]):
+        try:
+            await self._run_bulk_steps(batch)
+        except Exception as exc:
+            logger.error("Bulk publish of %d listings failed: %s", len(batch), exc, exc_info=True)
+            for listing in batch:
+                if not listing.future.done():
+                    listing.future.set_exception(exc)
+
+    async def _run_bulk_steps(self, batch: list[PendingListing]):
+        headers = await self._headers_provider()
+        client = get_http_client()
+        by_sku = {listing.sku: listing for listing in batch}
+
+        inventory_response = await client.post(
+            "/sell/inventory/v1/bulk_create_or_replace_inventory_item",
+            headers=headers,
+            json={
+                "requests": [
+                    {**listing.inventory_payload, "locale": BULK_LOCALE} for listing in batch
+                ]
+            },
+            timeout=60,
+        )
+        if inventory_response.status_code not in (200, 207):
+            self._fail_all(
+                batch,
+                f"Failed to create inventory item: {inventory_response.status_code} {inventory_response.text}",
+            )
+            return
+
+        created: list[PendingListing] = []
+        for item in inventory_response.json().get("responses") or []:
+            listing = by_sku.get(item.get("sku"))
+            if not listing:
+                continue
+            if item.get("statusCode") in (200, 201, 204):
+                created.append(listing)
+            else:
+                self._resolve(
+                    listing,
+                    f"Failed to create inventory item: {item.get('statusCode')} {_format_errors(item)}",
+                )
+        if not created:
+            self._fail_all(batch, "Failed to create inventory item: no response from eBay")
+            return
+
+        offer_response = await client.post(
+            "/sell/inventory/v1/bulk_create_offer",
+            headers=headers,
+            json={"requests": [listing.offer_payload for listing in created]},
+            timeout=60,
+        )
+        if offer_response.status_code not in (200, 207):
+            self._fail_all(
+                created,
+                f"Failed to create offer: {offer_response.status_code} {offer_response.text}",
+            )
+            return
+
+        by_offer_id: Dict[str, PendingListing] = {}
+        for item in offer_response.json().get("responses") or []:
+            listing = by_sku.get(item.get("sku"))
+            if not listing:
+                continue
+            offer_id = item.get("offerId")
+            if item.get("statusCode") in (200, 201) and offer_id:
+                by_offer_id[offer_id] = listing
+            else:
+                self._resolve(
+                    listing,
+                    f"Failed to create offer: {item.get('statusCode')} {_format_errors(item)}",
+                )
+        if not by_offer_id:
+            self._fail_all(created, "Failed to create offer: no response from eBay")
+            return
+
+        publish_response = await client.post(
+            "/sell/inventory/v1/bulk_publish_offer",
+            headers=headers,
+            json={"requests": [{"offerId": offer_id} for offer_id in by_offer_id]},
+            timeout=60,
+        )
+        if publish_response.status_code not in (200, 207):
+            self._fail_all(
+                list(by_offer_id.values()),
+                f"Failed to publish offer: {publish_response.status_code} {publish_response.text}",
+            )
+            return
+
+        for item in publish_response.json().get("responses") or []:
+            offer_id = item.get("offerId")
+            listing = by_offer_id.get(offer_id)
+            if not listing:
+                continue
+            if item.get("statusCode") == 200:
+                self._resolve(listing, f"Successfully published offer: {offer_id}")
+            else:
+                self._resolve(
+                    listing,
+                    f"Failed to publish offer: {item.get('statusCode')} {_format_errors(item)}",
+                )
+        self._fail_all(batch, "Failed to publish offer: no response from eBay")
+
+    def _resolve(self, listing: PendingListing, result: str):
+        if listing.future.done():
+            return
+        logger.info("Bulk publish result for sku %s (user %s): %s", listing.sku, listing.submitted_by, result)
+        listing.future.set_result(result)
+
+    def _fail_all(self, listings: list[PendingListing], result: str):
+        for listing in listings:
+            self._resolve(listing, result)
@@ -0,0 +1,220 @@
+import asyncio
+import contextlib
+import gzip
+import heapq
+import json
+import logging
+import math
+import os
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from auth.ebay_oauth import get_access_token
+from clients.http_client import get_http_client
+from configs.config import (
+    CATEGORY_INDEX_ENABLED,
+    CATEGORY_INDEX_PATH,
+    CATEGORY_INDEX_REFRESH_HOURS,
+    MARKETPLACE_ID,
+)
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"and", "or", "the", "for", "with", "of", "in", "to", "a", "an", "other", "new", "used"}
+_NAME_WEIGHT = 2.0
+_PATH_WEIGHT = 1.0
+
+_index: Optional["CategoryIndex"] = None
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def _tokenize(text: str) -> list[str]:
+    tokens = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        if token in _STOPWORDS or len(token) < 2:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class CategoryIndex:
+    """
+    Inverted index over leaf category names and their ancestor paths.
+    Categories are stored as [category_id, category_name, path] rows.
+    """
+
+    def __init__(self, tree_id: str, version: str, categories: list[list[str]]) -> None:
+        self.tree_id = tree_id
+        self.version = version
+        self.categories = categories
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._name_lengths: list[int] = []
+        for idx, (_, name, path) in enumerate(categories):
+            name_tokens = set(_tokenize(name))
+            self._name_lengths.append(len(name_tokens))
+            for token in set(_tokenize(path)):
+                self._postings[token][idx] = _PATH_WEIGHT
+            for token in name_tokens:
+                self._postings[token][idx] = _NAME_WEIGHT
+        total = max(len(categories), 1)
+        self._idf = {
+            token: math.log(1 + total / len(postings)) for token, postings in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def search(self, query: str) -> Optional[Tuple[str, str, float]]:
+        """
+        Returns (category_id, category_name, confidence) for the best match, or None.
+        Confidence is the share of the query's known-token weight matched by the leaf name,
+        discounted when the runner-up scores almost as high.
+        """
+        tokens = [token for token in dict.fromkeys(_tokenize(query)) if token in self._postings]
+        if not tokens:
+            return None
+
+        scores: Dict[int, float] = defaultdict(float)
+        for token in tokens:
+            idf = self._idf[token]
+            for idx, weight in self._postings[token].items():
+                scores[idx] += idf * weight
+        # Prefer specific leaves: a long category name matching the same tokens ranks lower.
+        ranked = heapq.nlargest(
+            2,
+            ((score / (1 + 0.05 * self._name_lengths[idx]), score, idx) for idx, score in scores.items()),
+        )
+        best_rank, best_score, best_idx = ranked[0]
+        runner_up = ranked[1][0] if len(ranked) > 1 else 0.0
+
+        max_score = sum(self._idf[token] * _NAME_WEIGHT for token in tokens)
+        coverage = best_score / max_score if max_score else 0.0
+        margin = (best_rank - runner_up) / best_rank if best_rank else 0.0
+        confidence = coverage * (0.5 + 0.5 * margin)
+        category_id, category_name, _ = self.categories[best_idx]
+        return category_id, category_name, round(min(confidence, 1.0), 4)
+
+
+def _flatten_tree(root: Dict[str, Any]) -> list[list[str]]:
+    categories: list[list[str]] = []
+    stack: list[Tuple[Dict[str, Any], Tuple[str, ...]]] = [(root, ())]
+    while stack:
+        node, ancestors = stack.pop()
+        category = node.get("category") or {}
+        name = category.get("categoryName") or ""
+        # The root node ("Root") carries no meaning for matching.
+        path = ancestors + (name,) if node.get("categoryTreeNodeLevel", 0) > 0 else ancestors
+        if node.get("leafCategoryTreeNode"):
+            categories.append([category.get("categoryId"), name, " > ".join(path)])
+            continue
+        for child in node.get("childCategoryTreeNodes") or []:
+            stack.append((child, path))
+    return categories
+
+
+def _load_index_file(path: Path) -> Optional[CategoryIndex]:
+    if not path.exists():
+        return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            payload = json.load(fh)
+        return CategoryIndex(payload["tree_id"], payload["version"], payload["categories"])
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning("Failed to load category index from %s: %s", path, exc)
+        return None
+
+
+def _build_and_store_index(path: Path, tree_id: str, raw_tree: bytes) -> CategoryIndex:
+    tree = json.loads(raw_tree)
+    version = str(tree.get("categoryTreeVersion") or "")
+    categories = _flatten_tree(tree.get("rootCategoryNode") or {})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+        json.dump({"tree_id": tree_id, "version": version, "categories": categories}, fh)
+    os.replace(tmp_path, path)
+    return CategoryIndex(tree_id, version, categories)
+
+
+async def _fetch_tree_version(headers: Dict[str, str]) -> Tuple[Optional[str], Optional[str]]:
+    response = await get_http_client().get(
+        "/commerce/taxonomy/v1/get_default_category_tree_id",
+        headers=headers,
+        params={"marketplace_id": MARKETPLACE_ID},
+        timeout=15,
+    )
+    response.raise_for_status()
+    data = response.json()
+    return data.get("categoryTreeId"), data.get("categoryTreeVersion")
+
+
+async def refresh_category_index(force: bool = False) -> Optional[CategoryIndex]:
+    """
+    Downloads the category tree only when eBay reports a different tree version than the local copy.
+    """
+    global _index
+    path = Path(CATEGORY_INDEX_PATH)
+    if _index is None:
+        _index = await asyncio.to_thread(_load_index_file, path)
+        if _index:
+            logger.info("Loaded category index %s v%s (%d leaves)", _index.tree_id, _index.version, len(_index))
+
+    token, _ = await get_access_token()
+    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json", "Accept-Encoding": "gzip"}
+    tree_id, version = await _fetch_tree_version(headers)
+    if not tree_id:
+        logger.warning("Default category tree id missing; keeping current category index.")
+        return _index
+    if not force and _index and _index.tree_id == tree_id and _index.version == str(version):
+        return _index
+
+    response = await get_http_client().get(
+        f"/commerce/taxonomy/v1/category_tree/{tree_id}",
+        headers=headers,
+        timeout=120,
+    )
+    response.raise_for_status()
+    _index = await asyncio.to_thread(_build_and_store_index, path, tree_id, response.content)
+    logger.info("Category index refreshed: tree %s v%s (%d leaves)", tree_id, _index.version, len(_index))
+    return _index
+
+
+def match_category(query: str, tree_id: Optional[str] = None) -> Optional[Tuple[str, str, float]]:
+    """
+    Returns a local (category_id, category_name, confidence) match, or None when no index is loaded.
+    """
+    if _index is None or (tree_id and tree_id != _index.tree_id):
+        return None
+    return _index.search(query)
+
+
+async def _refresh_loop():
+    while True:
+        try:
+            await refresh_category_index()
+        except Exception as exc:
+            logger.warning("Category index refresh failed: %s", exc)
+        await asyncio.sleep(CATEGORY_INDEX_REFRESH_HOURS * 3600)
+
+
+def start_category_index():
+    global _refresh_task
+    if not CATEGORY_INDEX_ENABLED:
+        return
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_category_index():
+    global _refresh_task
+    if _refresh_task is None:
+        return
+    _refresh_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await _refresh_task
+    _refresh_task = None
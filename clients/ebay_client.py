@@ -1,18 +1,29 @@
+import asyncio
+import hashlib
+import json
 import logging
 import uuid
+import weakref
 from html import unescape
 from html.parser import HTMLParser
 from typing import Any, Dict, Optional
 
-import requests
+import httpx
 
 from auth.ebay_oauth import get_access_token
+from clients.ebay_bulk_client import BulkPublisher
+from clients.http_client import get_http_client
 from configs.config import (
+    EBAY_BULK_BATCH_SIZE,
+    EBAY_BULK_FLUSH_SECONDS,
+    EBAY_BULK_PUBLISH_ENABLED,
     MARKETPLACE_ID,
     MERCHANT_LOCATION_KEY,
     PAYMENT_POLICY_ID,
     RETURN_POLICY_ID,
 )
+from utils.disk_cache import DiskCache
+from utils.metrics import timed_stage
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +34,19 @@ INVENTORY_CONDITION_DESCRIPTION = (
 DEFAULT_CATEGORY_ID = "179753"
 DEFAULT_CURRENCY = "USD"
 _PLACEHOLDER_STRINGS = {"n/a", "na", "none", "unknown", "not applicable", "unspecified"}
-_MERCHANT_LOCATION_KEY_CACHE: Optional[str] = MERCHANT_LOCATION_KEY if MERCHANT_LOCATION_KEY else None
+_LOCATION_KEY_TTL_SECONDS = 24 * 3600
+_LOCATION_CACHE_KEY = "merchant_location_key"
+_metadata_cache = DiskCache("ebay_inventory")
+_PUBLISH_CHECKPOINT_TTL_SECONDS = 7 * 24 * 3600
+_PUBLISH_CHECKPOINT_MAX_ROWS = 10000
+_OFFER_EXISTS_ERROR_ID = 25002
+# createOffer-only fields that updateOffer rejects.
+_OFFER_CREATE_ONLY_FIELDS = ("sku", "marketplaceId", "format")
+_publish_checkpoints = DiskCache("ebay_publish", max_rows=_PUBLISH_CHECKPOINT_MAX_ROWS)
+_publish_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+_MERCHANT_LOCATION_KEY_CACHE: Optional[str] = (
+    MERCHANT_LOCATION_KEY or _metadata_cache.get(_LOCATION_CACHE_KEY)
+)
 
 
 class _HTMLTextExtractor(HTMLParser):
@@ -168,17 +191,17 @@ def _build_offer_payload(
     }
 
 
-def _fetch_merchant_location_key(headers: Dict[str, str]) -> Optional[str]:
+async def _fetch_merchant_location_key(headers: Dict[str, str]) -> Optional[str]:
     params = {"limit": 1}
     try:
-        response = requests.get(
-            "https://api.ebay.com/sell/inventory/v1/location",
+        response = await get_http_client().get(
+            "/sell/inventory/v1/location",
             headers=headers,
             params=params,
             timeout=15,
         )
         response.raise_for_status()
-    except requests.RequestException as exc:
+    except httpx.HTTPError as exc:
         logger.error("Failed to fetch eBay inventory locations: %s", exc)
         return None
 
@@ -192,17 +215,38 @@ def _fetch_merchant_location_key(headers: Dict[str, str]) -> Optional[str]:
     return None
 
 
-def _resolve_merchant_location_key(headers: Dict[str, str]) -> Optional[str]:
+async def _resolve_merchant_location_key(headers: Dict[str, str]) -> Optional[str]:
     global _MERCHANT_LOCATION_KEY_CACHE
     if _MERCHANT_LOCATION_KEY_CACHE:
         return _MERCHANT_LOCATION_KEY_CACHE
-    key = _fetch_merchant_location_key(headers)
+    key = await _fetch_merchant_location_key(headers)
     if key:
         _MERCHANT_LOCATION_KEY_CACHE = key
+        _metadata_cache.set(_LOCATION_CACHE_KEY, key, ttl=_LOCATION_KEY_TTL_SECONDS)
     return _MERCHANT_LOCATION_KEY_CACHE
 
 
-def publish_item(
+async def _current_headers() -> Dict[str, str]:
+    token, _ = await get_access_token()
+    return _build_headers(token)
+
+
+_bulk_publisher = BulkPublisher(
+    headers_provider=_current_headers,
+    batch_size=EBAY_BULK_BATCH_SIZE,
+    flush_delay=EBAY_BULK_FLUSH_SECONDS,
+)
+
+
+def _payload_digest(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _save_checkpoint(listing_id: str, checkpoint: Dict[str, Any]):
+    _publish_checkpoints.set(listing_id, checkpoint, ttl=_PUBLISH_CHECKPOINT_TTL_SECONDS)
+
+
+async def publish_item(
     title: str,
     description: str,
     brand: str,
@@ -215,63 +259,169 @@ def publish_item(
     price: float,
     fulfillment_policy_id: str | None = None,
     category_id: str | None = None,
+    submitted_by: int | None = None,
+    listing_id: str | None = None,
+) -> str:
+    """
+    Publishes one listing (inventory item, offer, publish). Progress is checkpointed per listing_id,
+    so calling again for the same listing resumes at the failed step with the same SKU and offer
+    instead of creating new ones; a listing that is already published returns its result again.
+    """
+    listing_id = listing_id or uuid.uuid4().hex[:12]
+    lock = _publish_locks.get(listing_id)
+    if lock is None:
+        lock = _publish_locks[listing_id] = asyncio.Lock()
+    async with lock:
+        checkpoint = _publish_checkpoints.get(listing_id) or {"sku": f"sku-{listing_id}", "step": None}
+        if checkpoint["step"] == "published":
+            return f"Successfully published offer: {checkpoint['offer_id']}"
+
+        headers = await _current_headers()
+        location_key = await _resolve_merchant_location_key(headers)
+        if not location_key:
+            return (
+                "Failed to resolve eBay inventory location. Please verify MERCHANT_LOCATION_KEY "
+                "or configure a default inventory location in eBay."
+            )
+        sku = checkpoint["sku"]
+
+        inventory_payload = _build_inventory_payload(
+            sku=sku,
+            title=title,
+            description=description,
+            image_urls=image_urls,
+            brand=brand,
+            model=model,
+            mpn=mpn,
+            color=color,
+            material=material,
+            product_type=product_type,
+        )
+        offer_payload = _build_offer_payload(
+            sku=sku,
+            description=description,
+            price=price,
+            fulfillment_policy_id=fulfillment_policy_id,
+            category_id=category_id,
+            merchant_location_key=location_key,
+        )
+
+        if EBAY_BULK_PUBLISH_ENABLED and checkpoint["step"] is None:
+            # A failed bulk attempt is resumed through the single-item steps below.
+            checkpoint["step"] = "bulk"
+            _save_checkpoint(listing_id, checkpoint)
+            result = await _bulk_publisher.submit(
+                sku=sku,
+                inventory_payload=inventory_payload,
+                offer_payload=offer_payload,
+                submitted_by=submitted_by,
+            )
+            if result.startswith("Successfully published offer: "):
+                checkpoint.update(step="published", offer_id=result.rsplit(" ", 1)[-1])
+                _save_checkpoint(listing_id, checkpoint)
+            return result
+
+        return await _publish_steps(listing_id, checkpoint, headers, inventory_payload, offer_payload)
+
+
+async def _publish_steps(
+    listing_id: str,
+    checkpoint: Dict[str, Any],
+    headers: Dict[str, str],
+    inventory_payload: Dict[str, Any],
+    offer_payload: Dict[str, Any],
 ) -> str:
-    token, _ = get_access_token()
-    headers = _build_headers(token)
-    location_key = _resolve_merchant_location_key(headers)
-    if not location_key:
-        return (
-            "Failed to resolve eBay inventory location. Please verify MERCHANT_LOCATION_KEY "
-            "or configure a default inventory location in eBay."
+    client = get_http_client()
+    sku = checkpoint["sku"]
+
+    inventory_digest = _payload_digest(inventory_payload)
+    if checkpoint.get("inventory_digest") != inventory_digest:
+        with timed_stage("ebay_inventory_item"):
+            inv_response = await client.put(
+                f"/sell/inventory/v1/inventory_item/{sku}",
+                headers=headers,
+                json=inventory_payload,
+                timeout=30,
+            )
+        if inv_response.status_code not in (200, 204):
+            return f"Failed to create inventory item: {inv_response.status_code} {inv_response.text}"
+        checkpoint.update(step="inventory", inventory_digest=inventory_digest)
+        _save_checkpoint(listing_id, checkpoint)
+
+    offer_digest = _payload_digest(offer_payload)
+    if not checkpoint.get("offer_id"):
+        with timed_stage("ebay_create_offer"):
+            offer_response = await client.post(
+                "/sell/inventory/v1/offer",
+                headers=headers,
+                json=offer_payload,
+                timeout=30,
+            )
+        if offer_response.status_code == 201:
+            checkpoint.update(offer_id=offer_response.json().get("offerId"), offer_digest=offer_digest)
+        else:
+            offer_id = await _existing_offer_id(offer_response, sku, headers)
+            if not offer_id:
+                return f"Failed to create offer: {offer_response.status_code} {offer_response.text}"
+            # The offer left by an earlier attempt may carry an outdated price or description.
+            checkpoint.update(offer_id=offer_id, offer_digest=None)
+        checkpoint["step"] = "offer"
+        _save_checkpoint(listing_id, checkpoint)
+
+    offer_id = checkpoint["offer_id"]
+    if checkpoint.get("offer_digest") != offer_digest:
+        update_payload = {
+            key: value for key, value in offer_payload.items() if key not in _OFFER_CREATE_ONLY_FIELDS
+        }
+        with timed_stage("ebay_update_offer"):
+            update_response = await client.put(
+                f"/sell/inventory/v1/offer/{offer_id}",
+                headers=headers,
+                json=update_payload,
+                timeout=30,
+            )
+        if update_response.status_code not in (200, 204):
+            return f"Failed to update offer: {update_response.status_code} {update_response.text}"
+        checkpoint["offer_digest"] = offer_digest
+        _save_checkpoint(listing_id, checkpoint)
+
+    with timed_stage("ebay_publish_offer"):
+        publish_response = await client.post(
+            f"/sell/inventory/v1/offer/{offer_id}/publish",
+            headers=headers,
+            timeout=30,
         )
-    sku = f"sku-{str(uuid.uuid4())[:8]}"
-
-    inventory_payload = _build_inventory_payload(
-        sku=sku,
-        title=title,
-        description=description,
-        image_urls=image_urls,
-        brand=brand,
-        model=model,
-        mpn=mpn,
-        color=color,
-        material=material,
-        product_type=product_type,
-    )
-
-    inv_response = requests.put(
-        f"https://api.ebay.com/sell/inventory/v1/inventory_item/{sku}",
-        headers=headers,
-        json=inventory_payload,
-        timeout=30,
-    )
-    if inv_response.status_code not in (200, 204):
-        return f"Failed to create inventory item: {inv_response.status_code} {inv_response.text}"
-
-    offer_payload = _build_offer_payload(
-        sku=sku,
-        description=description,
-        price=price,
-        fulfillment_policy_id=fulfillment_policy_id,
-        category_id=category_id,
-        merchant_location_key=location_key,
-    )
-    offer_response = requests.post(
-        "https://api.ebay.com/sell/inventory/v1/offer",
-        headers=headers,
-        json=offer_payload,
-        timeout=30,
-    )
-    if offer_response.status_code != 201:
-        return f"Failed to create offer: {offer_response.status_code} {offer_response.text}"
-
-    offer_id = offer_response.json().get("offerId")
-    publish_response = requests.post(
-        f"https://api.ebay.com/sell/inventory/v1/offer/{offer_id}/publish",
-        headers=headers,
-        timeout=30,
-    )
     if publish_response.status_code != 200:
         return f"Failed to publish offer: {publish_response.status_code} {publish_response.text}"
 
+    checkpoint["step"] = "published"
+    _save_checkpoint(listing_id, checkpoint)
     return f"Successfully published offer: {offer_id}"
+
+
+async def _existing_offer_id(response: httpx.Response, sku: str, headers: Dict[str, str]) -> Optional[str]:
+    """
+    Returns the id of the offer that already exists for the SKU when createOffer was rejected for that reason.
+    """
+    try:
+        errors = response.json().get("errors") or []
+    except ValueError:
+        return None
+    for error in errors:
+        if error.get("errorId") != _OFFER_EXISTS_ERROR_ID:
+            continue
+        for parameter in error.get("parameters") or []:
+            if parameter.get("name") == "offerId" and parameter.get("value"):
+                return parameter["value"]
+        lookup = await get_http_client().get(
+            "/sell/inventory/v1/offer",
+            headers=headers,
+            params={"sku": sku, "marketplace_id": MARKETPLACE_ID},
+            timeout=15,
+        )
+        if lookup.status_code != 200:
+            return None
+        for offer in lookup.json().get("offers") or []:
+            if offer.get("offerId"):
+                return offer["offerId"]
+    return None
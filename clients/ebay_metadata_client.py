@@ -1,17 +1,39 @@
 import logging
-import time
 from typing import Optional, Tuple
 
-import requests
+import httpx
 
 from auth.ebay_oauth import get_access_token
-from configs.config import EBAY_CATEGORY_TREE_ID, MARKETPLACE_ID
+from clients.ebay_category_index import match_category
+from clients.http_client import get_http_client
+from configs.config import (
+    CATEGORY_CACHE_MAX_ENTRIES,
+    CATEGORY_CACHE_NEGATIVE_TTL,
+    CATEGORY_CACHE_PERSISTENT,
+    CATEGORY_CACHE_TTL,
+    CATEGORY_INDEX_MIN_CONFIDENCE,
+    EBAY_CATEGORY_TREE_ID,
+    MARKETPLACE_ID,
+)
+from utils.disk_cache import DiskCache
+from utils.lru_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
-_CACHE_TTL_SECONDS = 300
-_cache: dict[str, Tuple[float, Tuple[Optional[str], Optional[str]]]] = {}
-_category_tree_id: Optional[str] = EBAY_CATEGORY_TREE_ID.strip() if EBAY_CATEGORY_TREE_ID else None
+_TREE_ID_TTL_SECONDS = 7 * 24 * 3600
+_TREE_ID_CACHE_KEY = f"category_tree_id:{MARKETPLACE_ID}"
+_cache = TTLCache(
+    max_size=CATEGORY_CACHE_MAX_ENTRIES,
+    ttl=CATEGORY_CACHE_TTL,
+    negative_ttl=CATEGORY_CACHE_NEGATIVE_TTL,
+    disk=(
+        DiskCache("category_suggestions", max_rows=CATEGORY_CACHE_MAX_ENTRIES) if CATEGORY_CACHE_PERSISTENT else None
+    ),
+)
+_metadata_cache = DiskCache("ebay_metadata")
+_category_tree_id: Optional[str] = (
+    EBAY_CATEGORY_TREE_ID or _metadata_cache.get(_TREE_ID_CACHE_KEY)
+)
 
 
 def _cache_key(query: str, tree_id: Optional[str]) -> str:
@@ -21,24 +43,23 @@ def _cache_key(query: str, tree_id: Optional[str]) -> str:
 
 
 def _cache_get(query: str, tree_id: Optional[str]) -> Optional[Tuple[Optional[str], Optional[str]]]:
-    key = _cache_key(query, tree_id)
-    cached = _cache.get(key)
-    if not cached:
+    cached = _cache.get(_cache_key(query, tree_id))
+    if cached is None:
         return None
-    timestamp, value = cached
-    if time.time() - timestamp > _CACHE_TTL_SECONDS:
-        _cache.pop(key, None)
-        return None
-    return value
+    category_id, category_name = cached
+    return category_id, category_name
 
 
 def _cache_set(query: str, tree_id: Optional[str], value: Tuple[Optional[str], Optional[str]]):
-    key = _cache_key(query, tree_id)
-    _cache[key] = (time.time(), value)
+    _cache.set(_cache_key(query, tree_id), list(value), negative=value[0] is None)
+
+
+def get_category_cache_stats():
+    return _cache.stats()
 
 
-def _fetch_default_category_tree_id(token: str) -> Optional[str]:
-    url = "https://api.ebay.com/commerce/taxonomy/v1/get_default_category_tree_id"
+async def _fetch_default_category_tree_id(token: str) -> Optional[str]:
+    url = "/commerce/taxonomy/v1/get_default_category_tree_id"
     params = {"marketplace_id": MARKETPLACE_ID}
     headers = {
         "Authorization": f"Bearer {token}",
@@ -46,9 +67,9 @@ def _fetch_default_category_tree_id(token: str) -> Optional[str]:
         "Content-Type": "application/json",
     }
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=15)
+        response = await get_http_client().get(url, headers=headers, params=params, timeout=15)
         response.raise_for_status()
-    except requests.RequestException as exc:
+    except httpx.HTTPError as exc:
         logger.warning("Failed to fetch default category tree id: %s", exc)
         return None
 
@@ -59,37 +80,48 @@ def _fetch_default_category_tree_id(token: str) -> Optional[str]:
     return tree_id
 
 
-def _resolve_category_tree_id(token: str) -> Optional[str]:
+async def _resolve_category_tree_id(token: str) -> Optional[str]:
     global _category_tree_id
     if _category_tree_id:
         return _category_tree_id
-    tree_id = _fetch_default_category_tree_id(token)
+    tree_id = await _fetch_default_category_tree_id(token)
     if tree_id:
         _category_tree_id = tree_id
+        _metadata_cache.set(_TREE_ID_CACHE_KEY, tree_id, ttl=_TREE_ID_TTL_SECONDS)
     return _category_tree_id
 
 
-def suggest_category(query: str) -> Tuple[Optional[str], Optional[str]]:
+async def suggest_category(query: str) -> Tuple[Optional[str], Optional[str]]:
     """
     Returns (category_id, category_name) suggested by eBay for the given query.
     """
     if not query:
         return None, None
 
-    token, _ = get_access_token()
-    tree_id = _resolve_category_tree_id(token)
+    known_tree_id = _category_tree_id
+    if known_tree_id:
+        cached = _cache_get(query, known_tree_id)
+        if cached:
+            return cached
+
+    local = match_category(query, known_tree_id)
+    if local and local[2] >= CATEGORY_INDEX_MIN_CONFIDENCE:
+        category_id, category_name, confidence = local
+        logger.debug("Local category match for '%s': %s (%.2f)", query, category_id, confidence)
+        return category_id, category_name
+
+    token, _ = await get_access_token()
+    tree_id = await _resolve_category_tree_id(token)
     if not tree_id:
         logger.warning("Unable to resolve category tree id; skipping suggestion.")
         return None, None
 
-    cached = _cache_get(query, tree_id)
-    if cached:
-        return cached
+    if tree_id != known_tree_id:
+        cached = _cache_get(query, tree_id)
+        if cached:
+            return cached
 
-    url = (
-        f"https://api.ebay.com/commerce/taxonomy/v1/category_tree/"
-        f"{tree_id}/get_category_suggestions"
-    )
+    url = f"/commerce/taxonomy/v1/category_tree/{tree_id}/get_category_suggestions"
     params = {"q": query}
     headers = {
         "Authorization": f"Bearer {token}",
@@ -98,9 +130,9 @@ def suggest_category(query: str) -> Tuple[Optional[str], Optional[str]]:
     }
 
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=15)
+        response = await get_http_client().get(url, headers=headers, params=params, timeout=15)
         response.raise_for_status()
-    except requests.RequestException as exc:
+    except httpx.HTTPError as exc:
         logger.warning(
             "Category suggestion failed for query '%s' with tree %s: %s", query, tree_id, exc
         )
@@ -0,0 +1,100 @@
+import importlib.util
+import logging
+from typing import Optional
+
+import httpx
+
+from configs.config import (
+    EBAY_API_BASE_URL,
+    EBAY_HTTP2_ENABLED,
+    EBAY_HTTP_CONNECT_TIMEOUT,
+    EBAY_HTTP_KEEPALIVE_EXPIRY,
+    EBAY_HTTP_MAX_CONNECTIONS,
+    EBAY_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    EBAY_HTTP_TIMEOUT,
+    EBAY_MAX_CONCURRENCY,
+    EBAY_RATE_BURST,
+    EBAY_RATE_PER_SECOND,
+    RATE_LIMIT_BASE_DELAY,
+    RATE_LIMIT_MAX_DELAY,
+    RATE_LIMIT_MAX_RETRIES,
+)
+from utils.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_client: Optional[httpx.AsyncClient] = None
+
+ebay_limiter = RateLimiter(
+    "ebay",
+    rate=EBAY_RATE_PER_SECOND,
+    burst=EBAY_RATE_BURST,
+    max_concurrency=EBAY_MAX_CONCURRENCY,
+    max_retries=RATE_LIMIT_MAX_RETRIES,
+    base_delay=RATE_LIMIT_BASE_DELAY,
+    max_delay=RATE_LIMIT_MAX_DELAY,
+)
+
+
+class _RateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Sends every eBay request (API and OAuth) through ebay_limiter.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: RateLimiter) -> None:
+        self._transport = transport
+        self._limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._limiter.call(
+            lambda: self._transport.handle_async_request(request),
+            idempotent=request.method in _IDEMPOTENT_METHODS,
+            description=f"{request.method} {request.url.path}",
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def _http2_supported() -> bool:
+    if not EBAY_HTTP2_ENABLED:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("EBAY_HTTP2_ENABLED is set but the 'h2' package is missing; using HTTP/1.1.")
+        return False
+    return True
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=EBAY_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=EBAY_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=EBAY_HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(EBAY_HTTP_TIMEOUT, connect=EBAY_HTTP_CONNECT_TIMEOUT)
+    transport = httpx.AsyncHTTPTransport(http2=_http2_supported(), limits=limits)
+    return httpx.AsyncClient(
+        base_url=EBAY_API_BASE_URL,
+        transport=_RateLimitedTransport(transport, ebay_limiter),
+        timeout=timeout,
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide eBay HTTP client so every call reuses pooled keep-alive connections.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is None:
+        return
+    await _client.aclose()
+    _client = None
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from configs.config import PHOTO_DEDUP_MAX_DISTANCE, PHOTO_STORE_TTL
+from utils.disk_cache import DiskCache
+from utils.image_util import hamming_distance
+
+
+class PhotoStore:
+    """
+    Index of Cloudinary uploads keyed by owner and the perceptual hash of the photo. A photo is only
+    reused for the same user, and only when its hash is within max_distance bits of an indexed one.
+
+    Entries are {"public_id", "secure_url", "owner", "phash", "sha256", "last_used_at", "published"};
+    sha256 is the digest of the uploaded bytes, so callers can tell an exact copy from a near one.
+    Entries expire PHOTO_STORE_TTL seconds after their last use: expired unpublished uploads are
+    deleted by the upload reaper (clients.upload_ledger), expired published ones just leave the index.
+    """
+
+    def __init__(self, disk: DiskCache, ttl: float, max_distance: int) -> None:
+        self._disk = disk
+        self._ttl = ttl
+        self._max_distance = max_distance
+        self._entries: Optional[Dict[str, dict]] = None
+        self._keys: Dict[str, str] = {}  # public_id -> entry key
+        self._owners: Dict[int, Set[str]] = {}  # owner -> entry keys, so lookups never scan other users
+
+    @staticmethod
+    def _key(owner: int, phash: int) -> str:
+        return f"{owner}:{phash:016x}"
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            self._entries = dict(self._disk.items())
+            for key, entry in self._entries.items():
+                self._index(key, entry)
+        return self._entries
+
+    def _index(self, key: str, entry: dict):
+        self._keys[entry["public_id"]] = key
+        if entry.get("phash") is not None:
+            self._owners.setdefault(entry["owner"], set()).add(key)
+
+    async def _save(self, entries: Dict[str, dict]):
+        # Copies, so the writer thread never serialises an entry that a later find() is refreshing.
+        if entries:
+            await asyncio.to_thread(self._disk.set_many, {key: dict(entry) for key, entry in entries.items()})
+
+    async def find(self, owner: int, phash: int) -> Optional[dict]:
+        entries = self._load()
+        best_key, best_distance = None, self._max_distance + 1
+        for key in self._owners.get(owner, ()):
+            distance = hamming_distance(entries[key]["phash"], phash)
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        if best_key is None:
+            return None
+        entry = entries[best_key]
+        # Reuse refreshes the entry, so an expired-but-not-yet-reaped upload becomes live again.
+        entry["last_used_at"] = time.time()
+        await self._save({best_key: entry})
+        return entry
+
+    async def add(self, owner: int, phash: int, sha256: str, public_id: str, secure_url: str):
+        key = self._key(owner, phash)
+        entry = {
+            "public_id": public_id,
+            "secure_url": secure_url,
+            "owner": owner,
+            "phash": phash,
+            "sha256": sha256,
+            "last_used_at": time.time(),
+            "published": False,
+        }
+        previous = self._load().get(key)
+        if previous is not None:
+            # Two uploads raced for the same hash; the older one is left to the upload reaper.
+            self._keys.pop(previous["public_id"], None)
+        self._entries[key] = entry
+        self._index(key, entry)
+        await self._save({key: entry})
+
+    def public_ids(self) -> set[str]:
+        self._load()
+        return set(self._keys)
+
+    async def mark_published(self, public_ids: Iterable[str]):
+        entries = self._load()
+        published = {}
+        for public_id in public_ids:
+            key = self._keys.get(public_id)
+            entry = entries.get(key) if key else None
+            if entry is not None and not entry["published"]:
+                entry["published"] = True
+                published[key] = entry
+        await self._save(published)
+
+    async def forget(self, public_ids: Iterable[str]):
+        entries = self._load()
+        forgotten = []
+        for public_id in public_ids:
+            key = self._keys.pop(public_id, None)
+            entry = entries.pop(key, None) if key is not None else None
+            if entry is not None:
+                self._owners.get(entry["owner"], set()).discard(key)
+                forgotten.append(key)
+        if forgotten:
+            await asyncio.to_thread(self._disk.delete_many, forgotten)
+
+    def expired(self) -> list[str]:
+        return [
+            entry["public_id"]
+            for entry in self._load().values()
+            if not entry["published"] and self._is_stale(entry)
+        ]
+
+    async def prune_published(self) -> int:
+        """
+        Drops published entries that were not reused within the TTL; their images stay on Cloudinary.
+        """
+        stale = [
+            entry["public_id"]
+            for entry in self._load().values()
+            if entry["published"] and self._is_stale(entry)
+        ]
+        await self.forget(stale)
+        return len(stale)
+
+    def _is_stale(self, entry: dict) -> bool:
+        return time.time() - entry["last_used_at"] > self._ttl
+
+
+photo_store = PhotoStore(DiskCache("photo_store"), ttl=PHOTO_STORE_TTL, max_distance=PHOTO_DEDUP_MAX_DISTANCE)
@@ -0,0 +1,162 @@
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+
+from clients.cloudinary_client import delete_images_async
+from clients.photo_store import photo_store
+from configs.config import (
+    UPLOAD_REAPER_ENABLED,
+    UPLOAD_REAPER_GRACE_PERIOD,
+    UPLOAD_REAPER_INTERVAL,
+    UPLOAD_REAPER_MAX_PER_RUN,
+)
+from utils.disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+_reaper_task: Optional[asyncio.Task] = None
+_reaper_stats = {
+    "runs": 0,
+    "deleted": 0,
+    "failed": 0,
+    "reclaimed_bytes": 0,
+    "last_run_at": None,
+}
+
+
+class UploadLedger:
+    """
+    Record of every Cloudinary upload made for a listing session, keyed by public id.
+
+    Entries are {"owner", "uploaded_at", "last_used_at", "bytes"}. Published uploads leave the
+    ledger; the rest (abandoned sessions, /end) are orphans once grace_period has passed since
+    their last use, and the reaper deletes them.
+    """
+
+    def __init__(self, disk: DiskCache, grace_period: float) -> None:
+        self._disk = disk
+        self._grace_period = grace_period
+        self._entries: Optional[Dict[str, dict]] = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            self._entries = dict(self._disk.items())
+        return self._entries
+
+    async def record(self, public_id: str, owner: Optional[int] = None, size: Optional[int] = None):
+        now = time.time()
+        entry = {"owner": owner, "uploaded_at": now, "last_used_at": now, "bytes": size}
+        self._load()[public_id] = entry
+        await self._save({public_id: entry})
+
+    async def touch(self, public_ids: Iterable[str]):
+        entries = self._load()
+        now = time.time()
+        touched = {}
+        for public_id in public_ids:
+            entry = entries.get(public_id)
+            if entry is not None:
+                entry["last_used_at"] = now
+                touched[public_id] = entry
+        await self._save(touched)
+
+    async def mark_published(self, public_ids: Iterable[str]):
+        # Published images belong to a live listing and are never reaped, so there is nothing left to track.
+        await self.forget(public_ids)
+
+    async def forget(self, public_ids: Iterable[str]):
+        entries = self._load()
+        forgotten = [public_id for public_id in public_ids if entries.pop(public_id, None) is not None]
+        if forgotten:
+            await asyncio.to_thread(self._disk.delete_many, forgotten)
+
+    async def _save(self, entries: Dict[str, dict]):
+        # The in-memory view is updated first; the rows are written in one batch off the event loop.
+        if entries:
+            await asyncio.to_thread(self._disk.set_many, {key: dict(entry) for key, entry in entries.items()})
+
+    def size_of(self, public_id: str) -> int:
+        entry = self._load().get(public_id)
+        return (entry or {}).get("bytes") or 0
+
+    def orphans(self) -> List[str]:
+        deadline = time.time() - self._grace_period
+        return [public_id for public_id, entry in self._load().items() if entry["last_used_at"] < deadline]
+
+    def stats(self) -> dict:
+        entries = list(self._load().values())
+        return {
+            "tracked": len(entries),
+            "tracked_bytes": sum(entry.get("bytes") or 0 for entry in entries),
+        }
+
+
+upload_ledger = UploadLedger(DiskCache("cloudinary_uploads"), grace_period=UPLOAD_REAPER_GRACE_PERIOD)
+
+
+async def _reap_candidates() -> List[str]:
+    await photo_store.prune_published()
+    # Photos in the dedup index are kept for resends until the index itself expires them.
+    indexed = photo_store.public_ids()
+    candidates = dict.fromkeys(public_id for public_id in upload_ledger.orphans() if public_id not in indexed)
+    candidates.update(dict.fromkeys(photo_store.expired()))
+    return list(candidates)[:UPLOAD_REAPER_MAX_PER_RUN]
+
+
+async def reap_orphaned_uploads() -> int:
+    """
+    Deletes unpublished uploads past their grace period (and expired dedup entries) from Cloudinary.
+    Returns the number of bytes reclaimed.
+    """
+    _reaper_stats["runs"] += 1
+    _reaper_stats["last_run_at"] = time.time()
+    candidates = await _reap_candidates()
+    if not candidates:
+        return 0
+    deleted = await delete_images_async(candidates)
+    reclaimed = sum(upload_ledger.size_of(public_id) for public_id in deleted)
+    await upload_ledger.forget(deleted)
+    await photo_store.forget(deleted)
+    _reaper_stats["deleted"] += len(deleted)
+    _reaper_stats["failed"] += len(candidates) - len(deleted)
+    _reaper_stats["reclaimed_bytes"] += reclaimed
+    logger.info(
+        "Reaped %d of %d orphaned Cloudinary uploads, reclaimed %.1f MB",
+        len(deleted),
+        len(candidates),
+        reclaimed / (1024 * 1024),
+    )
+    return reclaimed
+
+
+def get_upload_reaper_stats() -> dict:
+    return {**_reaper_stats, **upload_ledger.stats(), "enabled": UPLOAD_REAPER_ENABLED}
+
+
+async def _reap_loop():
+    while True:
+        try:
+            await reap_orphaned_uploads()
+        except Exception as exc:
+            logger.warning("Reaping orphaned uploads failed: %s", exc)
+        await asyncio.sleep(UPLOAD_REAPER_INTERVAL)
+
+
+def start_upload_reaper():
+    global _reaper_task
+    if not UPLOAD_REAPER_ENABLED:
+        return
+    if _reaper_task is None or _reaper_task.done():
+        _reaper_task = asyncio.create_task(_reap_loop())
+
+
+async def stop_upload_reaper():
+    global _reaper_task
+    if _reaper_task is None:
+        return
+    _reaper_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await _reaper_task
+    _reaper_task = None
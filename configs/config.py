@@ -21,6 +21,33 @@ def _get_env(name: str, *, required: bool = True, default: Optional[str] = None)
     return value
 
 
+def _get_int_env(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError as exc:
+        raise RuntimeError(f"Environment variable {name} must be an integer.") from exc
+
+
+def _get_float_env(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError as exc:
+        raise RuntimeError(f"Environment variable {name} must be a number.") from exc
+
+
+def _get_bool_env(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
 for _env_name in _REQUIRED_ENV_VARS:
     _get_env(_env_name)  # validate eagerly
 
@@ -34,13 +61,138 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
 CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
 CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
-EBAY_CATEGORY_TREE_ID = os.getenv("EBAY_CATEGORY_TREE_ID", "0")
+# Empty resolves the marketplace default tree from eBay once and caches it on disk.
+EBAY_CATEGORY_TREE_ID = os.getenv("EBAY_CATEGORY_TREE_ID", "").strip()
+
+# SERVICE ENDPOINTS (override to run against local stand-ins, e.g. the benchmarks/ fake services)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "").strip() or None  # None keeps the SDK default
+CLOUDINARY_UPLOAD_PREFIX = os.getenv("CLOUDINARY_UPLOAD_PREFIX", "").strip().rstrip("/")
+TELEGRAM_API_BASE_URL = os.getenv("TELEGRAM_API_BASE_URL", "https://api.telegram.org").strip().rstrip("/")
+
+# PHOTO INGESTION
+TELEGRAM_MAX_IMAGE_BYTES = _get_int_env("TELEGRAM_MAX_IMAGE_BYTES", 20 * 1024 * 1024)
+CLOUDINARY_CHUNKED_UPLOAD_THRESHOLD = _get_int_env("CLOUDINARY_CHUNKED_UPLOAD_THRESHOLD", 8 * 1024 * 1024)
+CLOUDINARY_UPLOAD_CHUNK_SIZE = _get_int_env("CLOUDINARY_UPLOAD_CHUNK_SIZE", 6 * 1024 * 1024)
+MEDIA_GROUP_WINDOW_SECONDS = _get_float_env("MEDIA_GROUP_WINDOW_SECONDS", 1.0)
+MEDIA_GROUP_MAX_WAIT_SECONDS = _get_float_env("MEDIA_GROUP_MAX_WAIT_SECONDS", 5.0)
+AI_MAX_IMAGES = _get_int_env("AI_MAX_IMAGES", 4)
+# Feed the vision model inline image data while the Cloudinary upload runs in parallel.
+AI_INLINE_IMAGES = _get_bool_env("AI_INLINE_IMAGES", True)
+# Stream schema-constrained (structured output) completions and surface fields as they arrive.
+AI_STREAMING = _get_bool_env("AI_STREAMING", False)
+
+# IMAGE PREPROCESSING (process pool)
+IMAGE_PREPROCESS_ENABLED = _get_bool_env("IMAGE_PREPROCESS_ENABLED", True)
+IMAGE_WORKERS = _get_int_env("IMAGE_WORKERS", min(2, os.cpu_count() or 1))
+IMAGE_LISTING_MAX_SIDE = _get_int_env("IMAGE_LISTING_MAX_SIDE", 1600)
+IMAGE_ANALYSIS_MAX_SIDE = _get_int_env("IMAGE_ANALYSIS_MAX_SIDE", 1024)
+
+# PHOTO DEDUP (per-user index of Cloudinary uploads by perceptual hash)
+PHOTO_DEDUP_ENABLED = _get_bool_env("PHOTO_DEDUP_ENABLED", True)
+PHOTO_DEDUP_MAX_DISTANCE = _get_int_env("PHOTO_DEDUP_MAX_DISTANCE", 2)  # bits out of 64
+PHOTO_STORE_TTL = _get_int_env("PHOTO_STORE_TTL", 7 * 24 * 3600)
+
+# TRACING (per-listing span timings, served at /debug/traces)
+TRACE_ENABLED = _get_bool_env("TRACE_ENABLED", True)
+TRACE_BUFFER_SIZE = _get_int_env("TRACE_BUFFER_SIZE", 200)  # most recent listings kept in memory
+TRACE_MAX_SPANS = _get_int_env("TRACE_MAX_SPANS", 500)  # per listing
+# JSON lines file, one line per handler run or publish job; empty disables the export.
+TRACE_EXPORT_PATH = _get_env("TRACE_EXPORT_PATH", required=False, default="")
+
+# DEBUG ENDPOINTS (/stats and /debug/traces expose user ids, titles and SKUs)
+# Sent as the X-Debug-Token header; empty disables the endpoints.
+DEBUG_TOKEN = _get_env("DEBUG_TOKEN", required=False, default="")
+
+# UPLOAD REAPER (deletes Cloudinary uploads that never made it into a published listing)
+UPLOAD_REAPER_ENABLED = _get_bool_env("UPLOAD_REAPER_ENABLED", True)
+UPLOAD_REAPER_GRACE_PERIOD = _get_int_env("UPLOAD_REAPER_GRACE_PERIOD", 48 * 3600)
+UPLOAD_REAPER_INTERVAL = _get_int_env("UPLOAD_REAPER_INTERVAL", 6 * 3600)
+UPLOAD_REAPER_MAX_PER_RUN = _get_int_env("UPLOAD_REAPER_MAX_PER_RUN", 1000)
+
+# AI ANALYSIS CACHE
+AI_CACHE_ENABLED = _get_bool_env("AI_CACHE_ENABLED", True)
+AI_CACHE_MAX_ENTRIES = _get_int_env("AI_CACHE_MAX_ENTRIES", 512)
+AI_CACHE_TTL = _get_int_env("AI_CACHE_TTL", 7 * 24 * 3600)
+AI_CACHE_PERSISTENT = _get_bool_env("AI_CACHE_PERSISTENT", True)
+
+# PERSISTENT CACHE (SQLite file shared by tokens and eBay metadata; empty value disables it)
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", ".cache/moto_bot.sqlite3").strip()
+# Seconds between purges of expired rows (and trims of bounded caches such as the AI analysis cache).
+CACHE_MAINTENANCE_INTERVAL = _get_int_env("CACHE_MAINTENANCE_INTERVAL", 6 * 3600)
+
+# TELEGRAM UPDATES (webhook mode when TELEGRAM_WEBHOOK_URL is set, long polling otherwise)
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "").strip().rstrip("/")  # public base URL of this service
+TELEGRAM_WEBHOOK_SECRET = _get_env("TELEGRAM_WEBHOOK_SECRET", required=bool(TELEGRAM_WEBHOOK_URL), default="")
+TELEGRAM_WEBHOOK_PATH = "/telegram/webhook"
+TELEGRAM_WEBHOOK_MAX_CONNECTIONS = _get_int_env("TELEGRAM_WEBHOOK_MAX_CONNECTIONS", 40)
+
+# UPDATE PROCESSING (updates of one user run in order, different users in parallel)
+UPDATE_SERIALIZE_PER_USER = _get_bool_env("UPDATE_SERIALIZE_PER_USER", True)
+UPDATE_MAX_CONCURRENCY = _get_int_env("UPDATE_MAX_CONCURRENCY", 32)
+UPDATE_MAX_PENDING = _get_int_env("UPDATE_MAX_PENDING", 1024)
+
+# WORKER COORDINATION (one uvicorn worker per host runs the bot; the others forward webhook updates to it)
+BOT_LEADER_LOCK_PATH = os.getenv("BOT_LEADER_LOCK_PATH", ".cache/bot_leader.lock")
+BOT_LEADER_SOCKET_PATH = os.getenv("BOT_LEADER_SOCKET_PATH", ".cache/bot_leader.sock")
+BOT_LEADER_RETRY_SECONDS = _get_float_env("BOT_LEADER_RETRY_SECONDS", 2.0)
+
+# BOT STATE (user sessions and conversation states; empty value disables persistence)
+BOT_STATE_DB_PATH = os.getenv("BOT_STATE_DB_PATH", ".cache/bot_state.sqlite3").strip()
+BOT_PERSISTENCE_INTERVAL = _get_float_env("BOT_PERSISTENCE_INTERVAL", 15.0)  # seconds between batched writes
+
+# CATEGORY SUGGESTION CACHE
+CATEGORY_CACHE_MAX_ENTRIES = _get_int_env("CATEGORY_CACHE_MAX_ENTRIES", 2048)
+CATEGORY_CACHE_TTL = _get_int_env("CATEGORY_CACHE_TTL", 3 * 24 * 3600)
+CATEGORY_CACHE_NEGATIVE_TTL = _get_int_env("CATEGORY_CACHE_NEGATIVE_TTL", 3600)
+CATEGORY_CACHE_PERSISTENT = _get_bool_env("CATEGORY_CACHE_PERSISTENT", True)
+
+# OFFLINE CATEGORY INDEX (local copy of the marketplace category tree)
+CATEGORY_INDEX_ENABLED = _get_bool_env("CATEGORY_INDEX_ENABLED", True)
+CATEGORY_INDEX_PATH = os.getenv("CATEGORY_INDEX_PATH", ".cache/category_tree.json.gz")
+CATEGORY_INDEX_MIN_CONFIDENCE = _get_float_env("CATEGORY_INDEX_MIN_CONFIDENCE", 0.6)
+CATEGORY_INDEX_REFRESH_HOURS = _get_float_env("CATEGORY_INDEX_REFRESH_HOURS", 24.0)
 
 EBAY_OAUTH_SCOPE = "https://api.ebay.com/oauth/api_scope https://api.ebay.com/oauth/api_scope/sell.inventory https://api.ebay.com/oauth/api_scope/sell.account"
-EBAY_OAUTH_URL = "https://api.ebay.com/identity/v1/oauth2/token"
+EBAY_API_BASE_URL = os.getenv("EBAY_API_BASE_URL", "https://api.ebay.com").rstrip("/")
+EBAY_OAUTH_URL = f"{EBAY_API_BASE_URL}/identity/v1/oauth2/token"
+EBAY_TOKEN_REFRESH_MARGIN = _get_int_env("EBAY_TOKEN_REFRESH_MARGIN", 300)  # seconds before expiry
+
+# HTTP CONFIGS (shared eBay connection pool)
+EBAY_HTTP2_ENABLED = _get_bool_env("EBAY_HTTP2_ENABLED", False)
+EBAY_HTTP_MAX_CONNECTIONS = _get_int_env("EBAY_HTTP_MAX_CONNECTIONS", 20)
+EBAY_HTTP_MAX_KEEPALIVE_CONNECTIONS = _get_int_env("EBAY_HTTP_MAX_KEEPALIVE_CONNECTIONS", 10)
+EBAY_HTTP_KEEPALIVE_EXPIRY = _get_float_env("EBAY_HTTP_KEEPALIVE_EXPIRY", 60.0)
+EBAY_HTTP_CONNECT_TIMEOUT = _get_float_env("EBAY_HTTP_CONNECT_TIMEOUT", 10.0)
+EBAY_HTTP_TIMEOUT = _get_float_env("EBAY_HTTP_TIMEOUT", 30.0)
+
+# RATE LIMITING (per dependency: requests per second, burst, concurrent calls; 0 rate disables the bucket)
+RATE_LIMIT_MAX_RETRIES = _get_int_env("RATE_LIMIT_MAX_RETRIES", 4)
+RATE_LIMIT_BASE_DELAY = _get_float_env("RATE_LIMIT_BASE_DELAY", 0.5)
+RATE_LIMIT_MAX_DELAY = _get_float_env("RATE_LIMIT_MAX_DELAY", 30.0)
+EBAY_RATE_PER_SECOND = _get_float_env("EBAY_RATE_PER_SECOND", 10.0)
+EBAY_RATE_BURST = _get_int_env("EBAY_RATE_BURST", 20)
+EBAY_MAX_CONCURRENCY = _get_int_env("EBAY_MAX_CONCURRENCY", 16)
+OPENAI_RATE_PER_SECOND = _get_float_env("OPENAI_RATE_PER_SECOND", 3.0)
+OPENAI_RATE_BURST = _get_int_env("OPENAI_RATE_BURST", 5)
+OPENAI_MAX_CONCURRENCY = _get_int_env("OPENAI_MAX_CONCURRENCY", 4)
+CLOUDINARY_RATE_PER_SECOND = _get_float_env("CLOUDINARY_RATE_PER_SECOND", 10.0)
+CLOUDINARY_RATE_BURST = _get_int_env("CLOUDINARY_RATE_BURST", 20)
+CLOUDINARY_MAX_CONCURRENCY = _get_int_env("CLOUDINARY_MAX_CONCURRENCY", 8)
+
+# PUBLISH QUEUE (listings are published in the background by a worker pool)
+PUBLISH_QUEUE_ENABLED = _get_bool_env("PUBLISH_QUEUE_ENABLED", True)
+PUBLISH_WORKERS = _get_int_env("PUBLISH_WORKERS", 4)
+PUBLISH_QUEUE_MAX_SIZE = _get_int_env("PUBLISH_QUEUE_MAX_SIZE", 200)
+PUBLISH_DRAIN_SECONDS = _get_float_env("PUBLISH_DRAIN_SECONDS", 30.0)  # shutdown grace for queued jobs
+
+# BULK PUBLISHING (bulkCreateOrReplaceInventoryItem / bulkCreateOffer / bulkPublishOffer)
+EBAY_BULK_PUBLISH_ENABLED = _get_bool_env("EBAY_BULK_PUBLISH_ENABLED", False)
+EBAY_BULK_BATCH_SIZE = _get_int_env("EBAY_BULK_BATCH_SIZE", 25)
+EBAY_BULK_FLUSH_SECONDS = _get_float_env("EBAY_BULK_FLUSH_SECONDS", 2.0)
 
 # EBAY CONFIGS
 MARKETPLACE_ID = "EBAY_US"
+# Set explicitly to empty to use the first inventory location of the account, resolved once and cached on disk.
 MERCHANT_LOCATION_KEY = os.getenv("MERCHANT_LOCATION_KEY", "IT").strip()
 PAYMENT_POLICY_ID = 273958512015
 RETURN_POLICY_ID = 273958551015
@@ -6,6 +6,7 @@ from .commands import (
     handle_back,
     handle_continue,
     handle_profile,
+    handle_retry,
     show_help,
     show_session_data,
     unknown_input,
@@ -23,6 +24,7 @@ def register_handlers(app, conv_handler):
     app.add_handler(CommandHandler("back", handle_back))
     app.add_handler(CommandHandler("continue", handle_continue))
     app.add_handler(CommandHandler("profile", handle_profile))
+    app.add_handler(CommandHandler("retry", handle_retry))
     app.add_handler(MessageHandler(filters.ALL, unknown_input))
 
 
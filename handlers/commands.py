@@ -5,6 +5,7 @@ from configs.product_profiles import find_profile, get_profile, list_profiles
 from .constants import (
     ASKING_PHOTOS,
     ASKING_PRICE,
+    CLOUDINARY_IDS,
     COLLECTING_DETAILS,
     IMAGE_URLS,
     PROFILE_ANSWERS,
@@ -15,6 +16,7 @@ from .constants import (
     TRANSIENT_SESSION_KEYS,
 )
 from .listing import delete_cloudinary_images_async
+from .publish_queue import publish_queue
 
 
 async def show_session_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -42,6 +44,7 @@ async def show_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/session - Show current session data\n"
         "/back - Go one step back\n"
         "/continue - Start a new product without ending the session\n"
+        "/retry [listing] [price] - Retry listings that failed to publish (all without a listing)\n"
         "/profile - View or select a product profile\n"
         "/help - Show this help message\n\n"
         "Send one of the commands to proceed."
@@ -61,7 +64,9 @@ async def handle_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ConversationHandler.END
 
     if IMAGE_URLS in user_data:
-        await delete_cloudinary_images_async(context)
+        # Cleanup runs in the background so the reply does not wait for Cloudinary.
+        cleanup = delete_cloudinary_images_async(list(user_data.get(CLOUDINARY_IDS, [])))
+        context.application.create_task(cleanup, update=update)
         for key in TRANSIENT_SESSION_KEYS:
             user_data.pop(key, None)
         await update.message.reply_text("Returning to photo upload. Please send photo(s) again:")
@@ -90,6 +95,34 @@ async def handle_continue(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ASKING_PHOTOS
 
 
+async def handle_retry(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    failed = publish_queue.failed_jobs(user.id) if user else []
+    if not failed:
+        await update.message.reply_text("There is no failed listing to retry.")
+        return
+
+    job_id = price = None
+    try:
+        if context.args:
+            job_id = int(context.args[0])
+        if len(context.args or []) > 1:
+            price = float(context.args[1])
+    except ValueError:
+        await update.message.reply_text("Invalid arguments. Use /retry, /retry 3 or /retry 3 19.99.")
+        return
+    if job_id is not None and job_id not in {job.job_id for job in failed}:
+        listings = "\n".join(f"{job.job_id}: {job.title}" for job in failed)
+        await update.message.reply_text(f"No failed listing {job_id}. Failed listings:\n{listings}")
+        return
+
+    retried = publish_queue.retry(user.id, job_id, price)
+    lines = [f"Retrying \"{job.title}\" (position {position})." for job, position in retried]
+    if len(retried) < (1 if job_id is not None else len(failed)):
+        lines.append("The publishing queue is full. Send /retry again in a minute for the rest.")
+    await update.message.reply_text("\n".join(lines))
+
+
 async def handle_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args if context.args else []
     if not args:
@@ -25,6 +25,7 @@ PROFILE_ID = "profile_id"
 PROFILE_FIELD_INDEX = "profile_field_index"
 PROFILE_FIELDS = "profile_fields"
 PROFILE_ANSWERS = "profile_answers"
+LISTING_ID = "listing_id"
 
 TRANSIENT_SESSION_KEYS = [
     IMAGE_URLS,
@@ -43,4 +44,5 @@ TRANSIENT_SESSION_KEYS = [
     CATEGORY_NAME,
     MATERIAL,
     CONDITION,
+    LISTING_ID,
 ]
@@ -88,8 +88,10 @@ async def end(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 
 
-def create_conv_handler():
+def create_conv_handler(persistent: bool = False):
     return ConversationHandler(
+        name="listing",
+        persistent=persistent,
         entry_points=[CommandHandler("start", start)],
         states={
             COLLECTING_DETAILS: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_field_input)],
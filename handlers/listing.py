@@ -1,25 +1,42 @@
 import asyncio
+import hashlib
 import logging
-import os
-from typing import Dict, List
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
 
 from telegram import Update
+from telegram.error import TelegramError
 from telegram.ext import ContextTypes
 
-from clients.cloudinary_client import delete_image, upload_image
+from clients.cloudinary_client import delete_images_async, upload_image_async
 from clients.ebay_client import publish_item
 from clients.ebay_metadata_client import suggest_category
+from clients.photo_store import photo_store
+from clients.upload_ledger import upload_ledger
+from configs.config import (
+    AI_INLINE_IMAGES,
+    AI_MAX_IMAGES,
+    AI_STREAMING,
+    PHOTO_DEDUP_ENABLED,
+    PUBLISH_QUEUE_ENABLED,
+    TELEGRAM_MAX_IMAGE_BYTES,
+)
 from configs.product_profiles import get_profile
-from helpers.ai_helper import analyze_product
+from helpers.ai_helper import analyze_product, image_data_url
 from utils.shipping_util import (
     WEIGHT_THRESHOLDS,
     pick_policy_by_weight_class,
     pick_weight_class_by_kg,
 )
 from utils.template_util import compose_listing_title, generate_product_description
+from utils.image_util import prepare_image
+from utils.metrics import record_dependency_error
+from utils.timing import StageTimer
+from utils.tracing import span
 
 from .constants import (
     AI_DATA_FETCHED,
+    ASKING_PHOTOS,
     ASKING_PRICE,
     BRAND,
     CATEGORY_ID,
@@ -31,6 +48,7 @@ from .constants import (
     ESTIMATED_WEIGHT,
     FULFILLMENT_POLICY_ID,
     IMAGE_URLS,
+    LISTING_ID,
     MATERIAL,
     MPN,
     MODEL,
@@ -43,11 +61,24 @@ from .constants import (
     TRANSIENT_SESSION_KEYS,
     WEIGHT_CLASS,
 )
+from .media_group import collect_media_group
+from .publish_queue import publish_queue
 
 logger = logging.getLogger(__name__)
 
+# Set once a photo batch is fully processed; price input waits for it when the prompt was sent early.
+_listing_ready: Dict[int, asyncio.Event] = {}
+
 
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Identifies the product across publish retries (deterministic SKU and publish checkpoints)
+    # and names its trace, from the first photo to the publish result.
+    listing_id = context.user_data.setdefault(LISTING_ID, uuid.uuid4().hex[:12])
+    with span("handle_photo", trace_id=listing_id, user_id=_user_id(update)):
+        return await _handle_photo(update, context)
+
+
+async def _handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message = update.message
     user_data = context.user_data
 
@@ -57,23 +88,26 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not message:
         return _current_state()
 
-    tg_file = None
-    temp_path = f"temp_{message.from_user.id}.img"
-
-    if message.photo:
-        largest_photo = max(message.photo, key=lambda p: p.file_size)
-        tg_file = await largest_photo.get_file()
-    elif (
-        message.document
-        and message.document.mime_type
-        and message.document.mime_type.startswith("image/")
-    ):
-        tg_file = await message.document.get_file()
+    if message.media_group_id:
+        messages = await collect_media_group(message)
+        if messages is None:
+            # Another update of the same album owns the processing.
+            return _current_state()
     else:
+        messages = [message]
+
+    sources = [source for source in map(_photo_source, messages) if source]
+    if not sources:
         await message.reply_text("Please send a valid image file (JPEG/PNG).")
         return _current_state()
 
-    await tg_file.download_to_drive(temp_path)
+    accepted = [item for item in sources if (item[0].file_size or 0) <= TELEGRAM_MAX_IMAGE_BYTES]
+    if len(accepted) < len(sources):
+        limit_mb = TELEGRAM_MAX_IMAGE_BYTES // (1024 * 1024)
+        await message.reply_text(f"The image is too large. Please send a file under {limit_mb} MB.")
+        sources = accepted
+        if not sources:
+            return _current_state()
 
     user_data.setdefault(IMAGE_URLS, [])
     user_data.setdefault(CLOUDINARY_IDS, [])
@@ -81,33 +115,177 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_data.setdefault(AI_DATA_FETCHED, False)
     user_data.setdefault(PRICE_PROMPT_SENT, False)
 
+    timer = StageTimer(f"photo batch of user {message.from_user.id if message.from_user else '?'}")
+    images = await timer.track(
+        "download",
+        asyncio.gather(*(_download_photo(source) for source, _ in sources), return_exceptions=True),
+    )
+    downloaded = []
+    for image, (_, filename) in zip(images, sources):
+        if isinstance(image, BaseException):
+            logger.error("Telegram download failed: %s", image, exc_info=image)
+            record_dependency_error("telegram")
+            continue
+        downloaded.append((image, filename))
+    if not downloaded:
+        await message.reply_text("Couldn't download the photo. Please try again.")
+        return _current_state()
+
+    prepared_images = await timer.track(
+        "preprocess",
+        asyncio.gather(*(prepare_image(image) for image, _ in downloaded)),
+    )
+
+    # The dedup lookup comes first: a reused near-duplicate decides which image the model must see.
+    owner = message.from_user.id if message.from_user else None
+    reusable = await asyncio.gather(*(_find_reusable(prepared, owner) for prepared in prepared_images))
+    # Uploads start right away and run while the images are analysed.
+    upload_task = asyncio.gather(
+        *(
+            _upload_or_reuse(prepared, cached, filename, owner, timer)
+            for prepared, cached, (_, filename) in zip(prepared_images, reusable, downloaded)
+        ),
+        return_exceptions=True,
+    )
+
+    needs_analysis = not (user_data[PHOTO_PROCESSING] or user_data[AI_DATA_FETCHED])
+    if not needs_analysis:
+        await _store_uploads(message, user_data, await upload_task)
+        if user_data[AI_DATA_FETCHED] and not user_data[PRICE_PROMPT_SENT] and user_data[IMAGE_URLS]:
+            # The analysis succeeded earlier but every upload failed, so the prompt was never sent.
+            await message.reply_text("Photo(s) uploaded. Now enter the price (e.g., 19.99):")
+            user_data[PRICE_PROMPT_SENT] = True
+        return ASKING_PRICE
+
+    user_data[PHOTO_PROCESSING] = True
+    session_key = _session_key(message)
+    ready = _listing_ready[session_key] = asyncio.Event()
     try:
-        uploaded = await asyncio.to_thread(upload_image, temp_path)
+        try:
+            # The cache key must describe exactly the images that are analysed.
+            if AI_INLINE_IMAGES:
+                analysed = [_analysis_input(prepared, cached) for prepared, cached in zip(prepared_images, reusable)]
+                image_inputs = [image for image, _ in analysed]
+                fingerprints = [fingerprint for _, fingerprint in analysed]
+            else:
+                uploaded_any = await _store_uploads(message, user_data, await upload_task)
+                upload_task = None
+                if not uploaded_any:
+                    return ASKING_PRICE
+                image_inputs = list(user_data[IMAGE_URLS])
+                # Cloudinary URLs are immutable per upload, so they identify the image content.
+                fingerprints = [f"url:{url}" for url in image_inputs]
+            listing_ready = await _prepare_listing(message, context, image_inputs, fingerprints, timer)
+        finally:
+            user_data[PHOTO_PROCESSING] = False
+        if upload_task is not None:
+            await _store_uploads(message, user_data, await upload_task)
+    finally:
+        _listing_ready.pop(session_key, None)
+        ready.set()
+    logger.info("Listing pipeline timings (%s)", timer.summary())
+
+    if not listing_ready or not user_data[IMAGE_URLS]:
+        return ASKING_PRICE
+
+    if not user_data[PRICE_PROMPT_SENT]:
+        await message.reply_text("Photo(s) uploaded. Now enter the price (e.g., 19.99):")
+        user_data[PRICE_PROMPT_SENT] = True
+
+    return ASKING_PRICE
+
+
+async def _find_reusable(prepared, owner: Optional[int]) -> Optional[dict]:
+    # Only the same user's photos are candidates, so a listing never shows someone else's image.
+    if not PHOTO_DEDUP_ENABLED or owner is None or prepared.phash is None:
+        return None
+    return await photo_store.find(owner, prepared.phash)
+
+
+async def _upload_or_reuse(
+    prepared, cached: Optional[dict], filename: str, owner: Optional[int], timer: StageTimer
+) -> Dict[str, Any]:
+    if cached:
+        logger.info("Reusing Cloudinary image %s for a duplicate photo", cached["public_id"])
+        await upload_ledger.touch([cached["public_id"]])
+        return {"secure_url": cached["secure_url"], "public_id": cached["public_id"]}
+    uploaded = await timer.track("upload", upload_image_async(prepared.listing, filename))
+    await upload_ledger.record(uploaded["public_id"], owner, uploaded.get("bytes"))
+    if PHOTO_DEDUP_ENABLED and owner is not None and prepared.phash is not None:
+        await photo_store.add(
+            owner,
+            prepared.phash,
+            hashlib.sha256(prepared.listing).hexdigest(),
+            uploaded["public_id"],
+            uploaded["secure_url"],
+        )
+    return uploaded
+
+
+async def _store_uploads(message, user_data, results) -> bool:
+    failed = 0
+    for uploaded in results:
+        if isinstance(uploaded, BaseException):
+            logger.error("Cloudinary upload failed: %s", uploaded, exc_info=uploaded)
+            failed += 1
+            continue
+        if uploaded["public_id"] in user_data[CLOUDINARY_IDS]:
+            continue  # the same photo was already sent for this product
         user_data[IMAGE_URLS].append(uploaded["secure_url"])
         user_data[CLOUDINARY_IDS].append(uploaded["public_id"])
-    except Exception as exc:
-        logger.error("Cloudinary upload failed: %s", exc, exc_info=True)
+    if failed == len(results):
         await message.reply_text("Couldn't upload the photo. Please try again.")
-        return ASKING_PRICE
-    finally:
-        try:
-            os.remove(temp_path)
-        except FileNotFoundError:
-            pass
+        return False
+    if failed:
+        await message.reply_text(f"Couldn't upload {failed} of {len(results)} photos. Please resend them.")
+    return True
 
-    if user_data[PHOTO_PROCESSING] or user_data[AI_DATA_FETCHED]:
-        return ASKING_PRICE
 
-    user_data[PHOTO_PROCESSING] = True
-    profile = get_profile(context.user_data.get(PROFILE_ID))
-    answers = context.user_data.get(PROFILE_ANSWERS, {})
+def _user_id(update: Update) -> Optional[int]:
+    return update.effective_user.id if update.effective_user else None
+
+
+def _session_key(message) -> int:
+    return message.from_user.id if message.from_user else message.chat_id
+
+
+def _image_fingerprint(data: bytes) -> str:
+    return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+
+def _analysis_input(prepared, cached: Optional[dict]) -> Tuple[str, str]:
+    # A near-duplicate is listed with the stored image; the model analyses that one so the text matches it.
+    if cached and cached.get("sha256") != hashlib.sha256(prepared.listing).hexdigest():
+        return cached["secure_url"], f"url:{cached['secure_url']}"
+    return image_data_url(prepared.analysis), _image_fingerprint(prepared.analysis)
+
+
+async def _prepare_listing(
+    message,
+    context: ContextTypes.DEFAULT_TYPE,
+    image_inputs: List[str],
+    fingerprints: List[str],
+    timer: StageTimer,
+) -> bool:
+    user_data = context.user_data
+    profile = get_profile(user_data.get(PROFILE_ID))
+    answers = user_data.get(PROFILE_ANSWERS, {})
+    progress = _StreamedListing(message, context, answers, timer) if AI_STREAMING else None
 
     try:
-        ai_data = await analyze_product(
-            image_url=user_data[IMAGE_URLS][0],
-            hints=answers,
-            profile_hint=profile.ai_hint,
-            weight_thresholds=WEIGHT_THRESHOLDS,
+        if progress:
+            await progress.start()
+        ai_data = await timer.track(
+            "analyze",
+            analyze_product(
+                image_urls=image_inputs,
+                hints=answers,
+                profile_hint=profile.ai_hint,
+                weight_thresholds=WEIGHT_THRESHOLDS,
+                max_images=AI_MAX_IMAGES,
+                image_fingerprints=fingerprints,
+                on_field=progress.on_field if progress else None,
+            ),
         )
         est_kg = ai_data.get("estimated_weight_kg")
         weight_class = ai_data.get("weight_class") or pick_weight_class_by_kg(est_kg)
@@ -121,15 +299,11 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         condition = _pick_value(ai_data.get("condition"), answers.get("condition"), "Used")
         mpn = _pick_value(ai_data.get("mpn"), answers.get("sku"))
 
-        title, description = generate_listing_content(ai_data, context, profile, answers)
-
         user_data.update(
             {
                 WEIGHT_CLASS: weight_class,
                 ESTIMATED_WEIGHT: est_kg,
                 FULFILLMENT_POLICY_ID: policy_id,
-                TITLE: title,
-                DESCRIPTION: description,
                 COLOR: color or "N/A",
                 MATERIAL: material or "N/A",
                 PRODUCT_TYPE: product_type or "Product",
@@ -137,34 +311,123 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 BRAND: brand or "N/A",
                 MODEL: model or "N/A",
                 MPN: mpn or "N/A",
-                AI_DATA_FETCHED: True,
             }
         )
 
-        category_id, category_name = await asyncio.to_thread(suggest_category, title)
+        title = _compose_title(ai_data, context, answers)
+        if progress and progress.title == title:
+            # The lookup started while the rest of the analysis was still streaming.
+            category_task = progress.category_task
+        else:
+            if progress:
+                progress.cancel()
+            category_task = asyncio.create_task(timer.track("category", suggest_category(title)))
+        try:
+            with timer.stage("render"):
+                description = _render_description(ai_data, context, profile)
+        except Exception:
+            category_task.cancel()
+            raise
+        category_id, category_name = await category_task
+
+        user_data.update({TITLE: title, DESCRIPTION: description, AI_DATA_FETCHED: True})
         if category_id:
             user_data[CATEGORY_ID] = category_id
             user_data[CATEGORY_NAME] = category_name
-            await message.reply_text(f"Suggested eBay category: {category_name} ({category_id})")
         else:
             user_data.pop(CATEGORY_ID, None)
             user_data.pop(CATEGORY_NAME, None)
+        if progress:
+            await progress.finish(title, category_id, category_name)
+        elif category_id:
+            await message.reply_text(f"Suggested eBay category: {category_name} ({category_id})")
     except Exception as exc:
+        if progress:
+            progress.cancel()
         logger.error("AI or listing preparation failed: %s", exc, exc_info=True)
-        user_data[PHOTO_PROCESSING] = False
         await message.reply_text("Processing failed. Please send the photo again.")
-        return ASKING_PRICE
-    finally:
-        user_data[PHOTO_PROCESSING] = False
-
-    if not user_data[PRICE_PROMPT_SENT]:
-        await message.reply_text("Photo(s) uploaded. Now enter the price (e.g., 19.99):")
-        user_data[PRICE_PROMPT_SENT] = True
+        return False
+    return True
+
+
+class _StreamedListing:
+    """
+    Follows a streamed analysis: once the title arrives it starts the category lookup, edits a single
+    status message with the title and category and sends the price prompt, while the description
+    and the remaining fields are still being generated.
+    """
+
+    def __init__(self, message, context: ContextTypes.DEFAULT_TYPE, answers: Dict, timer: StageTimer) -> None:
+        self._message = message
+        self._context = context
+        self._answers = answers
+        self._timer = timer
+        self._fields: Dict[str, Any] = {}
+        self._status = None
+        self._announce_task: Optional[asyncio.Task] = None
+        self.title: Optional[str] = None
+        self.category_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._status = await self._message.reply_text("Analyzing photos…")
+
+    def on_field(self, name: str, value: Any):
+        self._fields[name] = value
+        if name != "title" or self.category_task is not None:
+            return
+        # brand and model precede the title in the schema. Empty fields become "N/A" as in the final
+        # analysis result, so this matches _compose_title and the category lookup is not repeated.
+        self.title = compose_listing_title(
+            ai_title=value or "N/A",
+            user_hint=self._answers.get("title_hint"),
+            brand=_pick_value(self._fields.get("brand") or "N/A", self._answers.get("brand")) or "N/A",
+            model=_pick_value(self._fields.get("model") or "N/A", self._answers.get("model")) or "N/A",
+        )
+        self.category_task = asyncio.create_task(self._timer.track("category", suggest_category(self.title)))
+        self._announce_task = asyncio.create_task(self._announce())
+
+    async def _announce(self):
+        await self._edit(f"Title: {self.title}\nLooking up the eBay category…")
+        category_id, category_name = await self.category_task
+        await self._edit(self._summary(self.title, category_id, category_name) + "\nWriting the description…")
+        user_data = self._context.user_data
+        if not user_data.get(PRICE_PROMPT_SENT):
+            user_data[PRICE_PROMPT_SENT] = True
+            await self._message.reply_text("Now enter the price (e.g., 19.99):")
+
+    async def finish(self, title: str, category_id: Optional[str], category_name: Optional[str]):
+        if self._announce_task is not None:
+            await asyncio.gather(self._announce_task, return_exceptions=True)
+        await self._edit(self._summary(title, category_id, category_name))
+
+    def cancel(self):
+        for task in (self.category_task, self._announce_task):
+            if task is not None:
+                task.cancel()
+        self.category_task = self._announce_task = None
+        self.title = None
+
+    @staticmethod
+    def _summary(title: str, category_id: Optional[str], category_name: Optional[str]) -> str:
+        if category_id:
+            return f"Title: {title}\nSuggested eBay category: {category_name} ({category_id})"
+        return f"Title: {title}"
 
-    return ASKING_PRICE
+    async def _edit(self, text: str):
+        if self._status is None:
+            return
+        try:
+            await self._status.edit_text(text)
+        except TelegramError as exc:
+            logger.debug("Could not update the listing status message: %s", exc)
 
 
 async def handle_price_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    with span("handle_price_input", trace_id=context.user_data.get(LISTING_ID), user_id=_user_id(update)):
+        return await _handle_price_input(update, context)
+
+
+async def _handle_price_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message = update.message
     if not message:
         return ASKING_PRICE
@@ -175,28 +438,56 @@ async def handle_price_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await message.reply_text("Invalid price. Please enter a numeric value like 19.99.")
         return ASKING_PRICE
 
+    pending = _listing_ready.get(_session_key(message))
+    if pending is not None:
+        # The price prompt can arrive before the description and uploads are done.
+        await pending.wait()
+
     data = context.user_data
     missing = [TITLE, DESCRIPTION, IMAGE_URLS]
     if not all(data.get(key) for key in missing):
         await message.reply_text("Missing listing data. Please resend the photo(s) and try again.")
         return ASKING_PRICE
 
-    try:
-        result = await asyncio.to_thread(
-            publish_item,
-            title=data[TITLE],
-            description=data[DESCRIPTION],
-            brand=data.get(BRAND),
-            model=data.get(MODEL),
-            mpn=data.get(MPN),
-            color=data.get(COLOR, "N/A"),
-            material=data.get(MATERIAL, "N/A"),
-            product_type=data.get(PRODUCT_TYPE, "Product"),
-            image_urls=data[IMAGE_URLS],
-            price=price,
-            fulfillment_policy_id=data.get(FULFILLMENT_POLICY_ID),
-            category_id=data.get(CATEGORY_ID),
+    publish_args = dict(
+        title=data[TITLE],
+        description=data[DESCRIPTION],
+        brand=data.get(BRAND),
+        model=data.get(MODEL),
+        mpn=data.get(MPN),
+        color=data.get(COLOR, "N/A"),
+        material=data.get(MATERIAL, "N/A"),
+        product_type=data.get(PRODUCT_TYPE, "Product"),
+        image_urls=list(data[IMAGE_URLS]),
+        price=price,
+        fulfillment_policy_id=data.get(FULFILLMENT_POLICY_ID),
+        category_id=data.get(CATEGORY_ID),
+        submitted_by=message.from_user.id if message.from_user else None,
+        listing_id=data.get(LISTING_ID),
+    )
+
+    if PUBLISH_QUEUE_ENABLED:
+        try:
+            position = publish_queue.submit(
+                bot=context.bot,
+                chat_id=message.chat_id,
+                user_id=message.from_user.id if message.from_user else None,
+                title=data[TITLE],
+                publish_args=publish_args,
+                cloudinary_ids=data.get(CLOUDINARY_IDS, []),
+            )
+        except asyncio.QueueFull:
+            await message.reply_text("The publishing queue is full. Please send the price again in a minute.")
+            return ASKING_PRICE
+        conclude_listing_session(context)
+        await message.reply_text(
+            f"Queued for publishing (position {position}); you will get the result here.\n"
+            "Send photos of the next product now, /continue, or /end to finish."
         )
+        return ASKING_PRICE
+
+    try:
+        result = await publish_item(**publish_args)
     except Exception as exc:
         logger.error("Failed to publish item: %s", exc, exc_info=True)
         await message.reply_text("Failed to contact eBay. Please try again.")
@@ -207,56 +498,57 @@ async def handle_price_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if not str(result).startswith("Successfully published"):
         return ASKING_PRICE
 
+    await photo_store.mark_published(data.get(CLOUDINARY_IDS, []))
+    await upload_ledger.mark_published(data.get(CLOUDINARY_IDS, []))
     conclude_listing_session(context)
     await message.reply_text("Do you want to list another product? Send photos now or /end to finish.")
     return ASKING_PRICE
 
 
+def _photo_source(message) -> Optional[Tuple[Any, str]]:
+    if message.photo:
+        largest_photo = max(message.photo, key=lambda p: p.file_size or 0)
+        return largest_photo, f"{largest_photo.file_unique_id}.jpg"
+    document = message.document
+    if document and document.mime_type and document.mime_type.startswith("image/"):
+        return document, document.file_name or document.file_unique_id
+    return None
+
+
+async def _download_photo(source) -> bytearray:
+    tg_file = await source.get_file()
+    return await tg_file.download_as_bytearray()
+
+
 def conclude_listing_session(context: ContextTypes.DEFAULT_TYPE):
     for key in TRANSIENT_SESSION_KEYS:
         context.user_data.pop(key, None)
 
 
-def generate_listing_content(
-    ai_data: Dict,
-    context: ContextTypes.DEFAULT_TYPE,
-    profile,
-    answers: Dict,
-):
-    tags_str = _join_tags(ai_data.get("tags"))
-    features = _clean_features(ai_data.get("features"))
-    brand = context.user_data.get(BRAND, "N/A")
-    model = context.user_data.get(MODEL, "N/A")
-    product_type = context.user_data.get(PRODUCT_TYPE, "Product")
-    color = context.user_data.get(COLOR, "N/A")
-    material = context.user_data.get(MATERIAL, "N/A")
-    condition = context.user_data.get(CONDITION, "Used")
-    included_items = ai_data.get("included_items", "N/A")
-    description_body = ai_data.get("description", "")
-
-    title = compose_listing_title(
+def _compose_title(ai_data: Dict, context: ContextTypes.DEFAULT_TYPE, answers: Dict) -> str:
+    return compose_listing_title(
         ai_title=ai_data.get("title"),
         user_hint=answers.get("title_hint"),
-        brand=brand,
-        model=model,
+        brand=context.user_data.get(BRAND, "N/A"),
+        model=context.user_data.get(MODEL, "N/A"),
     )
 
-    description = generate_product_description(
+
+def _render_description(ai_data: Dict, context: ContextTypes.DEFAULT_TYPE, profile) -> str:
+    return generate_product_description(
         template_name=profile.template,
-        product_type=product_type,
-        brand=brand,
-        model=model,
-        color=color,
-        material=material,
-        condition=condition,
-        included_items=included_items,
-        features=features,
-        description=description_body,
-        tags=tags_str,
+        product_type=context.user_data.get(PRODUCT_TYPE, "Product"),
+        brand=context.user_data.get(BRAND, "N/A"),
+        model=context.user_data.get(MODEL, "N/A"),
+        color=context.user_data.get(COLOR, "N/A"),
+        material=context.user_data.get(MATERIAL, "N/A"),
+        condition=context.user_data.get(CONDITION, "Used"),
+        included_items=ai_data.get("included_items", "N/A"),
+        features=_clean_features(ai_data.get("features")),
+        description=ai_data.get("description", ""),
+        tags=_join_tags(ai_data.get("tags")),
     )
 
-    return title, description
-
 
 def _join_tags(tags: List[str] | None) -> str:
     cleaned = []
@@ -299,10 +591,12 @@ def _pick_value(*candidates):
     return None
 
 
-async def delete_cloudinary_images_async(context: ContextTypes.DEFAULT_TYPE):
-    ids = context.user_data.get(CLOUDINARY_IDS, [])
-    for public_id in ids:
-        try:
-            await asyncio.to_thread(delete_image, public_id)
-        except Exception as exc:
-            logger.warning("Failed to delete Cloudinary image %s: %s", public_id, exc)
+async def delete_cloudinary_images_async(public_ids: List[str]):
+    # Indexed photos stay so a resend can reuse them; the index TTL and the upload reaper expire them.
+    indexed = photo_store.public_ids()
+    public_ids = [public_id for public_id in public_ids if public_id not in indexed]
+    if public_ids:
+        deleted = await delete_images_async(public_ids)
+        await photo_store.forget(deleted)
+        await upload_ledger.forget(deleted)
+        logger.info("Deleted %d of %d Cloudinary images", len(deleted), len(public_ids))
@@ -0,0 +1,51 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from telegram import Message
+
+from configs.config import MEDIA_GROUP_MAX_WAIT_SECONDS, MEDIA_GROUP_WINDOW_SECONDS
+
+
+@dataclass
+class _PendingGroup:
+    started_at: float
+    last_seen: float
+    messages: List[Message] = field(default_factory=list)
+
+
+_groups: Dict[str, _PendingGroup] = {}
+
+
+async def collect_media_group(message: Message) -> Optional[List[Message]]:
+    """
+    Buffers album updates that share a media_group_id.
+
+    The first update of a group waits until no new photo has arrived for MEDIA_GROUP_WINDOW_SECONDS
+    (capped by MEDIA_GROUP_MAX_WAIT_SECONDS) and returns every message of the album in order.
+    Later updates of the same group are added to the buffer and get None back.
+    """
+    loop = asyncio.get_running_loop()
+    group_id = message.media_group_id
+    group = _groups.get(group_id)
+    if group is not None:
+        group.messages.append(message)
+        group.last_seen = loop.time()
+        return None
+
+    now = loop.time()
+    group = _PendingGroup(started_at=now, last_seen=now, messages=[message])
+    _groups[group_id] = group
+    try:
+        while True:
+            deadline = min(
+                group.last_seen + MEDIA_GROUP_WINDOW_SECONDS,
+                group.started_at + MEDIA_GROUP_MAX_WAIT_SECONDS,
+            )
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+    finally:
+        _groups.pop(group_id, None)
+    return sorted(group.messages, key=lambda m: m.message_id)
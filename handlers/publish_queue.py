@@ -0,0 +1,223 @@
+import asyncio
+import contextlib
+import contextvars
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from clients.ebay_client import publish_item
+from clients.photo_store import photo_store
+from clients.upload_ledger import upload_ledger
+from configs.config import (
+    EBAY_BULK_BATCH_SIZE,
+    EBAY_BULK_PUBLISH_ENABLED,
+    PUBLISH_DRAIN_SECONDS,
+    PUBLISH_QUEUE_MAX_SIZE,
+    PUBLISH_WORKERS,
+)
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PublishJob:
+    job_id: int
+    bot: Any = field(repr=False)
+    chat_id: int
+    user_id: Optional[int]
+    title: str
+    publish_args: Dict[str, Any] = field(repr=False)
+    cloudinary_ids: List[str] = field(default_factory=list)
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+class PublishQueue:
+    """
+    In-process queue of listings waiting to be published, drained by a fixed pool of workers.
+
+    The price handler enqueues a snapshot of the listing and returns right away; the worker
+    reports the outcome to the chat. Failed jobs are kept per user, by job id, for /retry.
+    """
+
+    def __init__(self, workers: int, max_size: int, drain_timeout: float) -> None:
+        self._workers = max(1, workers)
+        self._max_size = max_size
+        self._drain_timeout = drain_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._ids = itertools.count(1)
+        self._running = 0
+        self._failed: Dict[int, Dict[int, PublishJob]] = {}
+        self._stats = {
+            "enqueued": 0,
+            "published": 0,
+            "failed": 0,
+            "retried": 0,
+            "wait_total": 0.0,
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+        }
+
+    def submit(
+        self,
+        bot,
+        chat_id: int,
+        user_id: Optional[int],
+        title: str,
+        publish_args: Dict[str, Any],
+        cloudinary_ids: List[str],
+    ) -> int:
+        """
+        Enqueues a listing and returns its position in the queue; raises asyncio.QueueFull when full.
+        """
+        job = PublishJob(
+            job_id=next(self._ids),
+            bot=bot,
+            chat_id=chat_id,
+            user_id=user_id,
+            title=title,
+            publish_args=publish_args,
+            cloudinary_ids=list(cloudinary_ids),
+        )
+        return self._put(job)
+
+    def retry(
+        self, user_id: int, job_id: Optional[int] = None, price: Optional[float] = None
+    ) -> List[Tuple[PublishJob, int]]:
+        """
+        Re-enqueues one failed job of the user (optionally with a new price), or all of them when job_id
+        is None. Returns (job, queue position) for each job enqueued; stops early when the queue is full.
+        """
+        failed = self._failed.get(user_id, {})
+        job_ids = [job_id] if job_id is not None else list(failed)
+        retried = []
+        for key in job_ids:
+            job = failed.get(key)
+            if job is None:
+                continue
+            if price is not None:
+                job.publish_args["price"] = price
+            job.enqueued_at = time.monotonic()
+            try:
+                position = self._put(job)
+            except asyncio.QueueFull:
+                break
+            del failed[key]
+            self._stats["retried"] += 1
+            retried.append((job, position))
+        if not failed:
+            self._failed.pop(user_id, None)
+        return retried
+
+    def failed_jobs(self, user_id: int) -> List[PublishJob]:
+        return list(self._failed.get(user_id, {}).values())
+
+    async def stop(self):
+        """
+        Lets the workers finish queued jobs for up to drain_timeout seconds, then cancels them.
+        """
+        if self._queue is not None and self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=self._drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Stopping with %d listings still queued for publishing", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        self._queue = None
+
+    def stats(self) -> dict:
+        finished = self._stats["published"] + self._stats["failed"]
+        return {
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "running": self._running,
+            "workers": self._workers,
+            "enqueued": self._stats["enqueued"],
+            "published": self._stats["published"],
+            "failed": self._stats["failed"],
+            "retried": self._stats["retried"],
+            "awaiting_retry": sum(len(jobs) for jobs in self._failed.values()),
+            "wait_avg": round(self._stats["wait_total"] / finished, 4) if finished else None,
+            "latency_avg": round(self._stats["latency_total"] / finished, 4) if finished else None,
+            "latency_max": round(self._stats["latency_max"], 4),
+        }
+
+    def _put(self, job: PublishJob) -> int:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._max_size)
+        if not self._tasks:
+            # Fresh contexts keep the workers out of the trace of the update that started them.
+            self._tasks = [
+                asyncio.create_task(self._worker(), context=contextvars.Context()) for _ in range(self._workers)
+            ]
+        self._queue.put_nowait(job)
+        self._stats["enqueued"] += 1
+        return self._queue.qsize() + self._running
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self._running += 1
+            try:
+                await self._run(job)
+            except Exception as exc:
+                logger.error("Publish job %d crashed: %s", job.job_id, exc, exc_info=True)
+            finally:
+                self._running -= 1
+                self._queue.task_done()
+
+    async def _run(self, job: PublishJob):
+        waited = time.monotonic() - job.enqueued_at
+        self._stats["wait_total"] += waited
+        job.attempts += 1
+        try:
+            with span(
+                "publish_job",
+                trace_id=job.publish_args.get("listing_id"),
+                job_id=job.job_id,
+                attempt=job.attempts,
+                queue_wait=round(waited, 4),
+            ):
+                result = await publish_item(**job.publish_args)
+        except Exception as exc:
+            logger.error("Failed to publish item: %s", exc, exc_info=True)
+            result = "Failed to contact eBay."
+        succeeded = str(result).startswith("Successfully published")
+
+        latency = time.monotonic() - job.enqueued_at
+        self._stats["latency_total"] += latency
+        self._stats["latency_max"] = max(self._stats["latency_max"], latency)
+        if succeeded:
+            self._stats["published"] += 1
+            await photo_store.mark_published(job.cloudinary_ids)
+            await upload_ledger.mark_published(job.cloudinary_ids)
+            text = f"{job.title}\n{result}"
+        else:
+            self._stats["failed"] += 1
+            if job.user_id is not None:
+                self._failed.setdefault(job.user_id, {})[job.job_id] = job
+            # Kept for /retry, so the reaper's grace period restarts now.
+            await upload_ledger.touch(job.cloudinary_ids)
+            text = (
+                f"{job.title}\n{result}\nSend /retry {job.job_id} to try again "
+                f"or /retry {job.job_id} <price> to change the price."
+            )
+        try:
+            await job.bot.send_message(chat_id=job.chat_id, text=text)
+        except Exception as exc:
+            logger.warning("Could not report publish job %d to chat %s: %s", job.job_id, job.chat_id, exc)
+
+
+publish_queue = PublishQueue(
+    # In bulk mode every waiting publish_item call joins the next batch, so a smaller pool caps its size.
+    workers=max(PUBLISH_WORKERS, EBAY_BULK_BATCH_SIZE) if EBAY_BULK_PUBLISH_ENABLED else PUBLISH_WORKERS,
+    max_size=PUBLISH_QUEUE_MAX_SIZE,
+    drain_timeout=PUBLISH_DRAIN_SECONDS,
+)
@@ -1,11 +1,34 @@
+import base64
+import copy
+import hashlib
 import json
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from openai import AsyncOpenAI
+from openai import APIConnectionError, AsyncOpenAI
 
-from configs.config import OPENAI_API_KEY
+from configs.config import (
+    AI_CACHE_ENABLED,
+    AI_CACHE_MAX_ENTRIES,
+    AI_CACHE_PERSISTENT,
+    AI_CACHE_TTL,
+    AI_STREAMING,
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_MAX_CONCURRENCY,
+    OPENAI_RATE_BURST,
+    OPENAI_RATE_PER_SECOND,
+    RATE_LIMIT_BASE_DELAY,
+    RATE_LIMIT_MAX_DELAY,
+    RATE_LIMIT_MAX_RETRIES,
+)
+from utils.disk_cache import DiskCache
+from utils.lru_cache import TTLCache
+from utils.rate_limit import Failure, RateLimiter
 from utils.shipping_util import WEIGHT_THRESHOLDS as DEFAULT_THRESHOLDS, pick_weight_class_by_kg
 
+# Bump when the post-processing of model output changes; template edits are picked up automatically.
+PROMPT_VERSION = "1"
+
 PROMPT_TEMPLATE = """
 You are an e-commerce copywriter who inspects product photos and crafts marketplace listings.
 
@@ -44,7 +67,50 @@ Rules:
 - Keep the title within the character limit and align estimated_weight_kg with weight_class.
 """
 
+_NULLABLE_STRING = {"type": ["string", "null"]}
+
+# Structured-output schema. Properties are emitted in this order, so brand and model arrive
+# before the title and the final listing title can be composed as soon as the title is streamed.
+LISTING_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "brand": {"type": "string"},
+        "model": {"type": "string"},
+        "title": {"type": "string"},
+        "category_hint": {"type": "string"},
+        "product_type": {"type": "string"},
+        "condition": {"type": "string"},
+        "estimated_weight_kg": {"type": ["number", "null"]},
+        "weight_class": _NULLABLE_STRING,
+        "material": {"type": "string"},
+        "color": {"type": "string"},
+        "mpn": {"type": "string"},
+        "included_items": {"type": "string"},
+        "features": {"type": "array", "items": {"type": "string"}},
+        "description": {"type": "string"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+    },
+    "additionalProperties": False,
+}
+LISTING_SCHEMA["required"] = list(LISTING_SCHEMA["properties"])
+
 _client: Optional[AsyncOpenAI] = None
+openai_limiter = RateLimiter(
+    "openai",
+    rate=OPENAI_RATE_PER_SECOND,
+    burst=OPENAI_RATE_BURST,
+    max_concurrency=OPENAI_MAX_CONCURRENCY,
+    max_retries=RATE_LIMIT_MAX_RETRIES,
+    base_delay=RATE_LIMIT_BASE_DELAY,
+    max_delay=RATE_LIMIT_MAX_DELAY,
+    describe_error=lambda exc: Failure(None) if isinstance(exc, APIConnectionError) else None,
+)
+_PROMPT_FINGERPRINT = f"{PROMPT_VERSION}:{hashlib.sha256(PROMPT_TEMPLATE.encode()).hexdigest()[:12]}"
+_analysis_cache = TTLCache(
+    max_size=AI_CACHE_MAX_ENTRIES,
+    ttl=AI_CACHE_TTL,
+    disk=DiskCache("ai_analysis", max_rows=AI_CACHE_MAX_ENTRIES) if AI_CACHE_PERSISTENT else None,
+)
 
 
 def _build_threshold_text(thresholds: Dict[str, float]) -> str:
@@ -73,10 +139,65 @@ def _get_client(client: Optional[AsyncOpenAI]) -> AsyncOpenAI:
     if _client is None:
         if not OPENAI_API_KEY:
             raise RuntimeError("OPENAI_API_KEY is not configured.")
-        _client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        # Retries are owned by openai_limiter, which also honours Retry-After across concurrent calls.
+        _client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
     return _client
 
 
+def _guess_image_mime(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.startswith(b"GIF8"):
+        return "image/gif"
+    return "image/jpeg"
+
+
+def image_data_url(data: bytes) -> str:
+    """
+    Encodes downloaded image bytes as an inline data URL, so analysis does not wait for the CDN upload.
+    """
+    encoded = base64.b64encode(data).decode("ascii")
+    return f"data:{_guess_image_mime(bytes(data[:12]))};base64,{encoded}"
+
+
+def _normalize_key_text(value: Any) -> str:
+    return " ".join(str(value or "").split()).lower()
+
+
+def _analysis_cache_key(
+    image_fingerprints: List[str],
+    hints: Dict[str, str],
+    profile_hint: str,
+    model_name: str,
+    max_title_len: int,
+    thresholds: Dict[str, float],
+) -> str:
+    normalized_hints = {
+        _normalize_key_text(key): _normalize_key_text(value)
+        for key, value in (hints or {}).items()
+        if _normalize_key_text(value)
+    }
+    material = json.dumps(
+        {
+            "prompt": _PROMPT_FINGERPRINT,
+            "model": model_name,
+            "images": image_fingerprints,
+            "hints": normalized_hints,
+            "profile": _normalize_key_text(profile_hint),
+            "max_title_len": max_title_len,
+            "thresholds": thresholds,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def get_analysis_cache_stats():
+    return _analysis_cache.stats()
+
+
 def _safe_json_loads(raw: str) -> Dict[str, Any]:
     try:
         return json.loads(raw)
@@ -88,6 +209,57 @@ def _safe_json_loads(raw: str) -> Dict[str, Any]:
         return {}
 
 
+class _JsonFieldStream:
+    """
+    Incremental parser for a streamed JSON object: returns each top-level member once its value is complete.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.text += chunk
+        fields: List[Tuple[str, Any]] = []
+        while self._pos < len(self.text):
+            char = self.text[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = self._pos + 1
+            elif char in "}]":
+                if self._depth == 1:
+                    fields.extend(self._close_member())
+                self._depth -= 1
+            elif char == "," and self._depth == 1:
+                fields.extend(self._close_member())
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return fields
+
+    def _close_member(self) -> List[Tuple[str, Any]]:
+        member = self.text[self._member_start : self._pos].strip()
+        if not member:
+            return []
+        try:
+            return list(json.loads("{" + member + "}").items())
+        except json.JSONDecodeError:
+            return []
+
+
 def _sanitize_str_list(values: Any, limit: int) -> List[str]:
     if isinstance(values, list):
         source = values
@@ -144,15 +316,41 @@ def _apply_defaults(data: Dict[str, Any]) -> Dict[str, Any]:
 
 
 async def analyze_product(
-    image_url: str,
+    image_urls: List[str],
     hints: Dict[str, str],
     profile_hint: str,
     max_title_len: int = 80,
     weight_thresholds: Optional[Dict[str, float]] = None,
     openai_client: Optional[AsyncOpenAI] = None,
     model_name: str = "gpt-4o-mini",
+    max_images: int = 4,
+    image_fingerprints: Optional[List[str]] = None,
+    stream: Optional[bool] = None,
+    on_field: Optional[Callable[[str, Any], None]] = None,
 ) -> Dict[str, Any]:
+    """
+    Runs one vision completion over all photos of a product (up to max_images).
+
+    When image_fingerprints (one per image URL) are given, results are memoized by the images,
+    normalized hints, profile hint, model and prompt version.
+
+    In streaming mode (AI_STREAMING unless stream is given) the completion is constrained to
+    LISTING_SCHEMA and on_field(name, value) is called for every raw field as soon as it is complete.
+    Cached results are returned without callbacks.
+    """
+    if not image_urls:
+        raise ValueError("analyze_product requires at least one image.")
     thresholds = weight_thresholds or DEFAULT_THRESHOLDS
+
+    cache_key = None
+    if AI_CACHE_ENABLED and image_fingerprints:
+        cache_key = _analysis_cache_key(
+            image_fingerprints[:max_images], hints, profile_hint, model_name, max_title_len, thresholds
+        )
+        cached = _analysis_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
     prompt_text = PROMPT_TEMPLATE.format(
         max_title_len=max_title_len,
         thresholds=_build_threshold_text(thresholds),
@@ -160,25 +358,74 @@ async def analyze_product(
         hints=_format_hints(hints),
     ).strip()
 
-    client = _get_client(openai_client)
-    response = await client.chat.completions.create(
-        model=model_name,
-        messages=[
-            {"role": "system", "content": "You create structured marketplace listings."},
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt_text},
-                    {"type": "image_url", "image_url": {"url": image_url}},
-                ],
-            },
-        ],
-    )
+    content: List[Dict[str, Any]] = [{"type": "text", "text": prompt_text}]
+    for url in image_urls[:max_images]:
+        content.append({"type": "image_url", "image_url": {"url": url}})
 
-    raw = (response.choices[0].message.content or "").strip()
-    data = _safe_json_loads(raw)
+    messages = [
+        {"role": "system", "content": "You create structured marketplace listings."},
+        {"role": "user", "content": content},
+    ]
+    client = _get_client(openai_client)
+    streaming = AI_STREAMING if stream is None else stream
+    if streaming:
+        data, parsed = await _stream_structured(client, model_name, messages, on_field)
+    else:
+        response = await openai_limiter.call(
+            lambda: client.chat.completions.create(model=model_name, messages=messages)
+        )
+        raw = (response.choices[0].message.content or "").strip()
+        data = _safe_json_loads(raw)
+        parsed = bool(data)
     data["weight_class"] = _normalize_weight_class(
         data.get("weight_class"),
         data.get("estimated_weight_kg"),
     )
-    return _apply_defaults(data)
+    data = _apply_defaults(data)
+    if cache_key and parsed:
+        _analysis_cache.set(cache_key, copy.deepcopy(data))
+    return data
+
+
+async def _stream_structured(
+    client: AsyncOpenAI,
+    model_name: str,
+    messages: List[Dict[str, Any]],
+    on_field: Optional[Callable[[str, Any], None]],
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Returns the parsed object and whether the streamed JSON was complete.
+    The stream is read inside the limited call, so it holds its concurrency slot until it ends.
+    """
+
+    async def consume() -> Tuple[_JsonFieldStream, Dict[str, Any]]:
+        parser = _JsonFieldStream()
+        fields: Dict[str, Any] = {}
+        stream = await client.chat.completions.create(
+            model=model_name,
+            messages=messages,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": "marketplace_listing", "strict": True, "schema": LISTING_SCHEMA},
+            },
+            stream=True,
+        )
+        async with stream:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                for name, value in parser.feed(delta):
+                    fields[name] = value
+                    if on_field:
+                        on_field(name, value)
+        return parser, fields
+
+    parser, fields = await openai_limiter.call(consume)
+    try:
+        return json.loads(parser.text), True
+    except json.JSONDecodeError:
+        # Truncated output (e.g. length limit): keep every field that was completed.
+        return fields, False
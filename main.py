@@ -1,15 +1,47 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api.routes import router
-from telegram_bot import start_bot, stop_bot
+from auth.ebay_oauth import start_token_refresher, stop_token_refresher
+from clients.ebay_category_index import start_category_index, stop_category_index
+from clients.http_client import close_http_client
+from clients.upload_ledger import start_upload_reaper, stop_upload_reaper
+from telegram_bot import start_bot, start_bot_leadership, stop_bot, stop_bot_leadership
+from utils.disk_cache import start_cache_maintenance, stop_cache_maintenance
+from utils.image_util import shutdown_image_workers, start_image_workers
+
+async def _on_elected():
+    # Singleton work: the bot (polling or webhook processing) and what only the bot uses.
+    start_category_index()
+    start_image_workers()
+    start_cache_maintenance()
+    start_upload_reaper()
+    try:
+        await start_bot()
+    except Exception:
+        # Leadership is handed back; nothing started for it may keep running on this worker.
+        await _stop_leader_work()
+        raise
+
+async def _stop_leader_work():
+    try:
+        await stop_bot()
+    finally:
+        await stop_upload_reaper()
+        await stop_cache_maintenance()
+        await stop_category_index()
+        shutdown_image_workers()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await start_bot()
+    start_token_refresher()
+    start_bot_leadership(_on_elected)
     try:
         yield
     finally:
-        await stop_bot()
+        await _stop_leader_work()
+        await stop_bot_leadership()
+        await stop_token_refresher()
+        await close_http_client()
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(router)
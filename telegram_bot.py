@@ -1,16 +1,43 @@
 import asyncio
 import contextlib
 import logging
+from typing import Any, Dict, List, Optional
 
+from telegram import Update
 from telegram.ext import ApplicationBuilder
 
-from configs.config import TELEGRAM_BOT_TOKEN
+from configs.config import (
+    BOT_LEADER_LOCK_PATH,
+    BOT_LEADER_RETRY_SECONDS,
+    BOT_LEADER_SOCKET_PATH,
+    BOT_PERSISTENCE_INTERVAL,
+    BOT_STATE_DB_PATH,
+    TELEGRAM_API_BASE_URL,
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_WEBHOOK_MAX_CONNECTIONS,
+    TELEGRAM_WEBHOOK_PATH,
+    TELEGRAM_WEBHOOK_SECRET,
+    TELEGRAM_WEBHOOK_URL,
+    UPDATE_MAX_CONCURRENCY,
+    UPDATE_MAX_PENDING,
+    UPDATE_SERIALIZE_PER_USER,
+)
 from handlers import create_conv_handler, register_handlers, error_handler
+from handlers.constants import PHOTO_PROCESSING
+from clients.upload_ledger import get_upload_reaper_stats
+from handlers.publish_queue import publish_queue
+from utils.leader import LeaderElection
+from utils.metrics import render_metrics
+from utils.telegram_persistence import SQLitePersistence
+from utils.tracing import trace_buffer
+from utils.update_processor import PerUserUpdateProcessor
 
 app_tg = None
 _polling_task = None
 _bot_started = False
 
+bot_leadership = LeaderElection(BOT_LEADER_LOCK_PATH, BOT_LEADER_SOCKET_PATH, BOT_LEADER_RETRY_SECONDS)
+
 
 async def start_bot():
     global app_tg, _polling_task, _bot_started
@@ -18,19 +45,45 @@ async def start_bot():
         logging.info("start_bot() skipped: already started")
         return
 
-    app_tg = ApplicationBuilder() \
+    if UPDATE_SERIALIZE_PER_USER:
+        concurrency = PerUserUpdateProcessor(UPDATE_MAX_CONCURRENCY, UPDATE_MAX_PENDING)
+    else:
+        concurrency = True
+    builder = ApplicationBuilder() \
         .token(TELEGRAM_BOT_TOKEN) \
-        .concurrent_updates(True) \
-        .build()
+        .base_url(f"{TELEGRAM_API_BASE_URL}/bot") \
+        .base_file_url(f"{TELEGRAM_API_BASE_URL}/file/bot") \
+        .concurrent_updates(concurrency)
+    if TELEGRAM_WEBHOOK_URL:
+        # Updates are pushed to the FastAPI route, so no Updater (getUpdates loop) is needed.
+        builder = builder.updater(None)
+    if BOT_STATE_DB_PATH:
+        builder = builder.persistence(SQLitePersistence(BOT_STATE_DB_PATH, update_interval=BOT_PERSISTENCE_INTERVAL))
+    app_tg = builder.build()
 
-    conv_handler = create_conv_handler()
+    conv_handler = create_conv_handler(persistent=bool(BOT_STATE_DB_PATH))
     register_handlers(app_tg, conv_handler)
     app_tg.add_error_handler(error_handler)
 
     await app_tg.initialize()
-    await app_tg.bot.delete_webhook(drop_pending_updates=True)
+    for user_data in app_tg.user_data.values():
+        # A restart interrupts any photo batch that was being processed.
+        if user_data.get(PHOTO_PROCESSING):
+            user_data[PHOTO_PROCESSING] = False
     await app_tg.start()
 
+    if TELEGRAM_WEBHOOK_URL:
+        await app_tg.bot.set_webhook(
+            url=f"{TELEGRAM_WEBHOOK_URL}{TELEGRAM_WEBHOOK_PATH}",
+            secret_token=TELEGRAM_WEBHOOK_SECRET,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=TELEGRAM_WEBHOOK_MAX_CONNECTIONS,
+        )
+        _bot_started = True
+        logging.info("Telegram bot started (webhook)")
+        return
+
+    await app_tg.bot.delete_webhook(drop_pending_updates=True)
     if not _polling_task or _polling_task.done():
         _polling_task = asyncio.create_task(
             app_tg.updater.start_polling(drop_pending_updates=True, timeout=30)
@@ -39,20 +92,126 @@ async def start_bot():
     _bot_started = True
     logging.info("Telegram bot started (polling)")
 
+
+def start_bot_leadership(on_elected):
+    """
+    Campaigns for bot leadership; only the elected worker runs on_elected (which starts the bot).
+    """
+    bot_leadership.start(
+        on_elected=on_elected,
+        handlers={
+            "update": _queue_update,
+            "metrics": _render_metrics_text,
+            "stats": _bot_stats,
+            "traces": _recent_traces,
+            "trace": _trace_detail,
+        },
+    )
+
+
+async def stop_bot_leadership():
+    await bot_leadership.stop()
+
+
+async def feed_webhook_update(payload: Dict[str, Any]) -> bool:
+    """
+    Queues an update received on the webhook route, or forwards it to the leader worker.
+    Returns False when no running bot accepted it.
+    """
+    if await _queue_update(payload):
+        return True
+    if not bot_leadership.is_leader:
+        return bool(await bot_leadership.request("update", payload))
+    return False
+
+
+async def leader_metrics() -> bytes:
+    """
+    Renders the Prometheus metrics of the leader, which runs the bot and so records the pipeline
+    metrics; a follower asks the leader over its socket and falls back to its own when none answers.
+    """
+    return (await _ask_leader("metrics", None, _render_metrics_text)).encode()
+
+
+async def leader_stats() -> Dict[str, Any]:
+    """
+    Stats of the work only the leader runs: the publish queue, update processing and the upload reaper.
+    """
+    return await _ask_leader("stats", None, _bot_stats)
+
+
+async def leader_traces(limit: int) -> List[Dict[str, Any]]:
+    return await _ask_leader("traces", limit, _recent_traces)
+
+
+async def leader_trace(trace_id: str) -> Optional[Dict[str, Any]]:
+    return await _ask_leader("trace", trace_id, _trace_detail)
+
+
+async def _ask_leader(kind: str, body: Any, local):
+    # Followers hold none of the bot's state; their own copy is only used when no leader answers.
+    if not bot_leadership.is_leader:
+        reply = await bot_leadership.request(kind, body)
+        if reply is not None:
+            return reply
+    return await local(body)
+
+
+def get_update_stats() -> Dict[str, Any]:
+    processor = app_tg.update_processor if app_tg else None
+    if isinstance(processor, PerUserUpdateProcessor):
+        return processor.stats()
+    return {}
+
+
+async def _render_metrics_text(_body: Any) -> str:
+    return render_metrics().decode()
+
+
+async def _bot_stats(_body: Any) -> Dict[str, Any]:
+    return {
+        "publish_queue": publish_queue.stats(),
+        "updates": get_update_stats(),
+        "upload_reaper": get_upload_reaper_stats(),
+    }
+
+
+async def _recent_traces(limit: Any) -> List[Dict[str, Any]]:
+    return [trace.summary() for trace in trace_buffer.recent(int(limit))]
+
+
+async def _trace_detail(trace_id: Any) -> Optional[Dict[str, Any]]:
+    trace = trace_buffer.get(str(trace_id))
+    return trace.to_dict() if trace is not None else None
+
+
+async def _queue_update(payload: Dict[str, Any]) -> bool:
+    if not _bot_started or app_tg is None:
+        return False
+    await app_tg.update_queue.put(Update.de_json(payload, app_tg.bot))
+    return True
+
 async def stop_bot():
     global app_tg, _polling_task, _bot_started
     if not app_tg:
         return
 
-    await app_tg.updater.stop()
+    # The webhook stays registered: other instances behind the load balancer keep receiving updates.
+    # start_bot may have failed half-way, so only what is actually running is stopped.
+    if app_tg.updater and app_tg.updater.running:
+        await app_tg.updater.stop()
     if _polling_task:
         _polling_task.cancel()
         with contextlib.suppress(asyncio.CancelledError):
             await _polling_task
         _polling_task = None
 
-    await app_tg.stop()
+    # Workers report results through the bot, so queued listings are drained while it still runs.
+    await publish_queue.stop()
+    if app_tg.running:
+        await app_tg.stop()
     await app_tg.shutdown()
+    app_tg = None
     _bot_started = False
     logging.info("Telegram bot stopped")
 
@@ -0,0 +1,261 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from configs.config import CACHE_DB_PATH, CACHE_MAINTENANCE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+_connection: Optional[sqlite3.Connection] = None
+_disabled = not CACHE_DB_PATH
+_connection_lock = threading.Lock()
+_io_lock = threading.Lock()
+_CORRUPT = object()
+_row_limits: Dict[str, int] = {}
+_maintenance_task: Optional[asyncio.Task] = None
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    global _connection, _disabled
+    if _connection is not None or _disabled:
+        return _connection
+    with _connection_lock:
+        if _connection is not None or _disabled:
+            return _connection
+        path = Path(CACHE_DB_PATH)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+            os.chmod(path, 0o600)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+        except (OSError, sqlite3.Error) as exc:
+            logger.warning("Persistent cache disabled (%s): %s", path, exc)
+            _disabled = True
+            return None
+        _connection = conn
+    return _connection
+
+
+@contextlib.contextmanager
+def _transaction(conn: sqlite3.Connection):
+    # The connection autocommits each statement; batches are written as a single transaction.
+    conn.execute("BEGIN")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class DiskCache:
+    """
+    TTL-aware key/value store backed by SQLite; every write is a single atomic statement.
+    Values must be JSON-serializable. All failures degrade to cache misses.
+
+    Expired rows are purged periodically (start_cache_maintenance); with max_rows the namespace is
+    also trimmed to the rows that expire last.
+    """
+
+    def __init__(self, namespace: str, max_rows: Optional[int] = None) -> None:
+        self.namespace = namespace
+        if max_rows is not None:
+            _row_limits[namespace] = max(0, max_rows)
+
+    def get(self, key: str) -> Optional[Any]:
+        conn = _connect()
+        if conn is None:
+            return None
+        try:
+            with _io_lock:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+        except sqlite3.Error as exc:
+            logger.warning("Persistent cache read failed for %s/%s: %s", self.namespace, key, exc)
+            return None
+        if not row:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return self._decode(key, value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        conn = _connect()
+        if conn is None:
+            return
+        expires_at = time.time() + ttl if ttl is not None else None
+        try:
+            with _io_lock:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), expires_at),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Persistent cache write failed for %s/%s: %s", self.namespace, key, exc)
+
+    def set_many(self, values: Dict[str, Any], ttl: Optional[float] = None):
+        conn = _connect()
+        if conn is None or not values:
+            return
+        expires_at = time.time() + ttl if ttl is not None else None
+        rows = [(self.namespace, key, json.dumps(value), expires_at) for key, value in values.items()]
+        try:
+            with _io_lock, _transaction(conn):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Persistent cache write failed for %s (%d keys): %s", self.namespace, len(rows), exc)
+
+    def items(self) -> list[tuple[str, Any]]:
+        conn = _connect()
+        if conn is None:
+            return []
+        try:
+            with _io_lock:
+                rows = conn.execute(
+                    "SELECT key, value FROM cache WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (self.namespace, time.time()),
+                ).fetchall()
+        except sqlite3.Error as exc:
+            logger.warning("Persistent cache scan failed for %s: %s", self.namespace, exc)
+            return []
+        decoded = [(key, self._decode(key, value, _CORRUPT)) for key, value in rows]
+        return [(key, value) for key, value in decoded if value is not _CORRUPT]
+
+    def _decode(self, key: str, value: str, corrupt: Any = None) -> Any:
+        # A row that no longer parses is a miss; it is dropped so it does not fail every read.
+        try:
+            return json.loads(value)
+        except (TypeError, ValueError) as exc:
+            logger.warning("Dropping corrupt persistent cache entry %s/%s: %s", self.namespace, key, exc)
+            self.delete(key)
+            return corrupt
+
+    def delete(self, key: str):
+        conn = _connect()
+        if conn is None:
+            return
+        try:
+            with _io_lock:
+                conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Persistent cache delete failed for %s/%s: %s", self.namespace, key, exc)
+
+    def delete_many(self, keys: Iterable[str]):
+        conn = _connect()
+        rows = [(self.namespace, key) for key in keys]
+        if conn is None or not rows:
+            return
+        try:
+            with _io_lock, _transaction(conn):
+                conn.executemany("DELETE FROM cache WHERE namespace = ? AND key = ?", rows)
+        except sqlite3.Error as exc:
+            logger.warning("Persistent cache delete failed for %s (%d keys): %s", self.namespace, len(rows), exc)
+
+    def purge_expired(self) -> int:
+        conn = _connect()
+        if conn is None:
+            return 0
+        try:
+            with _io_lock:
+                cursor = conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                    (self.namespace, time.time()),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Persistent cache purge failed for %s: %s", self.namespace, exc)
+            return 0
+        return cursor.rowcount
+
+    def trim(self, max_rows: int) -> int:
+        conn = _connect()
+        if conn is None:
+            return 0
+        try:
+            with _io_lock:
+                cursor = conn.execute(
+                    "DELETE FROM cache WHERE rowid IN ("
+                    " SELECT rowid FROM cache WHERE namespace = ?"
+                    " ORDER BY expires_at IS NULL DESC, expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, max_rows),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Persistent cache trim failed for %s: %s", self.namespace, exc)
+            return 0
+        return cursor.rowcount
+
+
+def maintain_cache() -> int:
+    """
+    Purges expired rows of every namespace and trims bounded namespaces; returns the rows removed.
+    Blocking: run it off the event loop.
+    """
+    conn = _connect()
+    if conn is None:
+        return 0
+    try:
+        with _io_lock:
+            removed = conn.execute(
+                "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            ).rowcount
+    except sqlite3.Error as exc:
+        logger.warning("Persistent cache purge failed: %s", exc)
+        removed = 0
+    for namespace, max_rows in list(_row_limits.items()):
+        removed += DiskCache(namespace).trim(max_rows)
+    return removed
+
+
+async def _maintenance_loop():
+    while True:
+        try:
+            removed = await asyncio.to_thread(maintain_cache)
+            if removed:
+                logger.info("Removed %d expired or excess persistent cache rows", removed)
+        except Exception as exc:
+            logger.warning("Persistent cache maintenance failed: %s", exc)
+        await asyncio.sleep(CACHE_MAINTENANCE_INTERVAL)
+
+
+def start_cache_maintenance():
+    global _maintenance_task
+    if _disabled:
+        return
+    if _maintenance_task is None or _maintenance_task.done():
+        _maintenance_task = asyncio.create_task(_maintenance_loop())
+
+
+async def stop_cache_maintenance():
+    global _maintenance_task
+    if _maintenance_task is None:
+        return
+    _maintenance_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await _maintenance_task
+    _maintenance_task = None
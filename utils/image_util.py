@@ -0,0 +1,139 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from configs.config import (
+    IMAGE_ANALYSIS_MAX_SIDE,
+    IMAGE_LISTING_MAX_SIDE,
+    IMAGE_PREPROCESS_ENABLED,
+    IMAGE_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+_LISTING_JPEG_QUALITY = 88
+_ANALYSIS_JPEG_QUALITY = 80
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    listing: bytes  # upright JPEG without metadata, bounded to IMAGE_LISTING_MAX_SIDE
+    analysis: bytes  # smaller JPEG copy for the vision model
+    width: int
+    height: int
+    phash: Optional[int] = None  # 64-bit difference hash, None when the image could not be decoded
+
+
+def _encode_jpeg(image: Image.Image, max_side: int, quality: int) -> bytes:
+    copy = image.copy()
+    copy.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = io.BytesIO()
+    # Saving without exif/icc arguments drops all source metadata (GPS, device info).
+    copy.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _difference_hash(image: Image.Image) -> int:
+    """
+    64-bit dHash: compares neighbouring pixels of a 9x8 grayscale thumbnail, robust to re-encoding and resizing.
+    """
+    gray = image.convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def hamming_distance(left: int, right: int) -> int:
+    return (left ^ right).bit_count()
+
+
+def preprocess_image(data: bytes) -> PreparedImage:
+    """
+    Normalises orientation, strips metadata and renders the listing and analysis copies.
+    CPU-bound: runs inside the process pool.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+    width, height = image.size
+    return PreparedImage(
+        listing=_encode_jpeg(image, IMAGE_LISTING_MAX_SIDE, _LISTING_JPEG_QUALITY),
+        analysis=_encode_jpeg(image, IMAGE_ANALYSIS_MAX_SIDE, _ANALYSIS_JPEG_QUALITY),
+        width=width,
+        height=height,
+        phash=_difference_hash(image),
+    )
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn keeps workers free of the parent's event loop and HTTP client state.
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+async def prepare_image(data: bytes) -> PreparedImage:
+    """
+    Runs preprocess_image in the process pool; unreadable images are passed through unchanged.
+    """
+    if not IMAGE_PREPROCESS_ENABLED:
+        return PreparedImage(listing=bytes(data), analysis=bytes(data), width=0, height=0)
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    try:
+        return await loop.run_in_executor(executor, preprocess_image, bytes(data))
+    except BrokenProcessPool as exc:
+        # A worker died (e.g. OOM-killed); the next call spawns a fresh pool.
+        logger.error("Image worker pool broke, using the original file: %s", exc)
+        _discard_executor(executor)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as exc:
+        logger.warning("Image preprocessing failed, using the original file: %s", exc)
+    return PreparedImage(listing=bytes(data), analysis=bytes(data), width=0, height=0)
+
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    global _executor
+    if _executor is executor:
+        _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def start_image_workers():
+    """
+    Spawns the worker processes up front so the first photo does not pay the interpreter start-up.
+    """
+    if not IMAGE_PREPROCESS_ENABLED:
+        return
+    executor = _get_executor()
+    for _ in range(IMAGE_WORKERS):
+        executor.submit(int)
+
+
+def shutdown_image_workers():
+    global _executor
+    if _executor is None:
+        return
+    _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
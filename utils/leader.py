@@ -0,0 +1,155 @@
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!I")
+
+
+class LeaderElection:
+    """
+    Elects one leader among the worker processes of a host with an exclusive flock on lock_path.
+
+    The kernel releases the lock when the leader dies, and followers retry every retry_interval
+    seconds, so another worker takes over automatically. The leader listens on a unix socket
+    where followers send JSON requests of a registered kind (e.g. webhook updates they received)
+    and get the handler's JSON reply back.
+    """
+
+    def __init__(self, lock_path: str, socket_path: str, retry_interval: float) -> None:
+        self._lock_path = Path(lock_path)
+        self._socket_path = Path(socket_path)
+        self._retry_interval = retry_interval
+        self._lock_fd: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._task: Optional[asyncio.Task] = None
+        self._handlers: Dict[str, Callable[[Any], Awaitable[Any]]] = {}
+        self._stats = {"elections": 0, "forwarded": 0, "forward_failures": 0, "received": 0}
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_fd is not None
+
+    def start(
+        self,
+        on_elected: Callable[[], Awaitable[None]],
+        handlers: Dict[str, Callable[[Any], Awaitable[Any]]],
+    ):
+        self._handlers = dict(handlers)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._campaign(on_elected))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self._resign()
+
+    async def request(self, kind: str, body: Any = None) -> Any:
+        """
+        Sends a request to the leader's handler for kind and returns its reply; None when no leader
+        is reachable (or the handler replied None).
+        """
+        try:
+            reader, writer = await asyncio.open_unix_connection(str(self._socket_path))
+        except OSError as exc:
+            self._stats["forward_failures"] += 1
+            logger.warning("Leader is not reachable at %s: %s", self._socket_path, exc)
+            return None
+        try:
+            await _write_frame(writer, {"kind": kind, "body": body})
+            reply = await _read_frame(reader)
+        except (OSError, ValueError, asyncio.IncompleteReadError) as exc:
+            self._stats["forward_failures"] += 1
+            logger.warning("Request %r to the leader failed: %s", kind, exc)
+            return None
+        finally:
+            writer.close()
+            with contextlib.suppress(OSError):
+                await writer.wait_closed()
+        self._stats["forwarded"] += 1
+        return reply
+
+    def stats(self) -> dict:
+        return {**self._stats, "pid": os.getpid(), "is_leader": self.is_leader}
+
+    async def _campaign(self, on_elected: Callable[[], Awaitable[None]]):
+        while True:
+            if self._try_lock():
+                self._stats["elections"] += 1
+                logger.info("Worker %d became the leader", os.getpid())
+                try:
+                    await self._serve()
+                    await on_elected()
+                    return
+                except Exception as exc:
+                    logger.error("Leader start-up failed, stepping down: %s", exc, exc_info=True)
+                    await self._resign()
+            await asyncio.sleep(self._retry_interval)
+
+    def _try_lock(self) -> bool:
+        self._lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._lock_fd = fd
+        return True
+
+    async def _serve(self):
+        # A socket file left by a crashed leader would make bind() fail.
+        with contextlib.suppress(FileNotFoundError):
+            self._socket_path.unlink()
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=str(self._socket_path))
+        os.chmod(self._socket_path, 0o600)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                message = await _read_frame(reader)
+                self._stats["received"] += 1
+                handler = self._handlers.get(message.get("kind"))
+                reply = await handler(message.get("body")) if handler is not None else None
+                await _write_frame(writer, reply)
+        except asyncio.IncompleteReadError:
+            pass  # follower closed the connection
+        except (OSError, ValueError) as exc:
+            logger.warning("Dropping a follower connection: %s", exc)
+        finally:
+            writer.close()
+
+    async def _resign(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            with contextlib.suppress(FileNotFoundError):
+                self._socket_path.unlink()
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> Any:
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return json.loads(await reader.readexactly(length))
+
+
+async def _write_frame(writer: asyncio.StreamWriter, value: Any):
+    body = json.dumps(value).encode()
+    writer.write(_HEADER.pack(len(body)) + body)
+    await writer.drain()
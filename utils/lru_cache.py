@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from utils.disk_cache import DiskCache
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with per-entry TTL, a shorter TTL for negative results
+    and an optional DiskCache tier that survives restarts.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        negative_ttl: Optional[float] = None,
+        disk: Optional[DiskCache] = None,
+    ) -> None:
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._disk = disk
+        self._entries: "OrderedDict[str, Tuple[float, Any, bool]]" = OrderedDict()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "disk_hits": 0,
+            "negative_hits": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value, negative = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._record_hit(negative)
+                return value
+            del self._entries[key]
+            self._stats["expirations"] += 1
+
+        if self._disk is not None:
+            stored = self._disk.get(key)
+            if stored is not None:
+                value = stored["value"]
+                negative = stored.get("negative", False)
+                remaining = stored["expires_at"] - time.time()
+                if remaining > 0:
+                    self._store_memory(key, value, remaining, negative)
+                    self._stats["disk_hits"] += 1
+                    self._record_hit(negative)
+                    return value
+
+        self._stats["misses"] += 1
+        return default
+
+    def set(self, key: str, value: Any, negative: bool = False):
+        ttl = self.negative_ttl if negative else self.ttl
+        self._store_memory(key, value, ttl, negative)
+        if self._disk is not None:
+            stored = {"value": value, "expires_at": time.time() + ttl, "negative": negative}
+            self._disk.set(key, stored, ttl=ttl)
+
+    def stats(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store_memory(self, key: str, value: Any, ttl: float, negative: bool):
+        self._entries[key] = (time.monotonic() + ttl, value, negative)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _record_hit(self, negative: bool):
+        self._stats["hits"] += 1
+        if negative:
+            self._stats["negative_hits"] += 1
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "motobot"
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+STAGE_SECONDS = Histogram(
+    f"{_PREFIX}_stage_duration_seconds",
+    "Duration of completed pipeline stages (Telegram download, upload, AI analysis, eBay calls, ...).",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+STAGE_FAILURES = Counter(
+    f"{_PREFIX}_stage_failures_total",
+    "Pipeline stages that raised an error.",
+    ["stage"],
+)
+DEPENDENCY_ERRORS = Counter(
+    f"{_PREFIX}_dependency_errors_total",
+    "Calls to an external dependency that failed after retries.",
+    ["dependency"],
+)
+
+_stats_sources: Dict[str, Tuple[Callable[[], Dict[str, Any]], Optional[str]]] = {}
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def record_stage_failure(stage: str):
+    STAGE_FAILURES.labels(stage).inc()
+
+
+def record_dependency_error(dependency: str):
+    DEPENDENCY_ERRORS.labels(dependency).inc()
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """
+    Observes the duration of the block in the stage histogram; errors count as stage failures instead.
+    The block is also recorded as a span of the current trace.
+    """
+    started = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        record_stage_failure(stage)
+        raise
+    observe_stage(stage, time.perf_counter() - started)
+
+
+def register_stats(source: str, collect: Callable[[], Dict[str, Any]], label: Optional[str] = None):
+    """
+    Exports the numeric values of a stats() dict as gauges named motobot_<source>_<key>, read at
+    scrape time so the hot path pays nothing. With a label, the dict maps label values (e.g. the
+    dependency name) to stats dicts.
+    """
+    _stats_sources[source] = (collect, label)
+
+
+def render_metrics() -> bytes:
+    """
+    Exposition of this process's registry; serve it with CONTENT_TYPE_LATEST.
+    """
+    return generate_latest(REGISTRY)
+
+
+class _StatsCollector:
+    def describe(self):
+        # Sources register after the collector, so there is nothing to declare up front.
+        return []
+
+    def collect(self):
+        for source, (collect, label) in list(_stats_sources.items()):
+            try:
+                stats = collect()
+            except Exception as exc:
+                logger.warning("Skipping %s stats in metrics: %s", source, exc)
+                continue
+            groups = stats.items() if label else [(None, stats)]
+            families: Dict[str, GaugeMetricFamily] = {}
+            for label_value, values in groups:
+                for key, value in _numeric_items(values):
+                    name = f"{_PREFIX}_{source}_{key}"
+                    family = families.get(name)
+                    if family is None:
+                        family = families[name] = GaugeMetricFamily(
+                            name, f"{key} from the {source} stats", labels=[label] if label else []
+                        )
+                    family.add_metric([str(label_value)] if label else [], value)
+            yield from families.values()
+
+
+def _numeric_items(values: Any) -> Iterator[Tuple[str, float]]:
+    if not isinstance(values, dict):
+        return
+    for key, value in values.items():
+        if isinstance(value, bool):
+            yield key, float(value)
+        elif isinstance(value, (int, float)):
+            yield key, value
+
+
+REGISTRY.register(_StatsCollector())
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+from utils.metrics import record_dependency_error
+from utils.tracing import annotate, span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_SERVER_ERRORS = {500, 502, 503, 504}
+# The request never left the client, so retrying cannot duplicate a side effect.
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+_TRANSIENT_ERRORS = (httpx.TransportError, ConnectionError, TimeoutError)
+
+_limiters: Dict[str, "RateLimiter"] = {}
+
+
+@dataclass(frozen=True)
+class Failure:
+    status: Optional[int]  # HTTP status, None for connection-level errors
+    retry_after: Optional[float] = None
+    sent: bool = True
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def describe_http_failure(value: Any) -> Optional[Failure]:
+    """
+    Classifies a response or an exception carrying one (httpx, openai) as a throttling or server failure.
+    """
+    response = value if isinstance(value, httpx.Response) else getattr(value, "response", None)
+    status = getattr(value, "status_code", None) or getattr(response, "status_code", None)
+    if status == 429 or status in _SERVER_ERRORS:
+        headers = getattr(response, "headers", None) or {}
+        return Failure(status, parse_retry_after(headers.get("Retry-After")))
+    if isinstance(value, _NOT_SENT_ERRORS):
+        return Failure(None, sent=False)
+    if isinstance(value, _TRANSIENT_ERRORS):
+        return Failure(None)
+    return None
+
+
+class RateLimiter:
+    """
+    Guards one external dependency: a token bucket (rate per second with a burst), a cap on concurrent
+    calls and retries with Retry-After-aware exponential backoff and full jitter.
+
+    Throttling (429) and requests that were never sent are always retried; server errors and
+    connection failures only for idempotent operations. A Retry-After pauses every caller of the
+    dependency, not just the one that received it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_concurrency: int,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+        describe_error: Optional[Callable[[BaseException], Optional[Failure]]] = None,
+    ) -> None:
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._describe_error = describe_error
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._bucket_lock = asyncio.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._stats = {
+            "calls": 0,
+            "retries": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "gave_up": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+        }
+        _limiters[name] = self
+
+    async def call(
+        self,
+        operation: Callable[[], Awaitable[T]],
+        idempotent: bool = True,
+        description: Optional[str] = None,
+    ) -> T:
+        """
+        Runs operation() under the limits, retrying transient failures. Failed responses that are not
+        retried (or exhaust the retries) are returned unchanged; exceptions are re-raised.
+        The whole call, retries included, is one span of the current trace.
+        """
+        attributes = {"call": description} if description else {}
+        with span(self.name, **attributes):
+            return await self._call(operation, idempotent)
+
+    async def _call(self, operation: Callable[[], Awaitable[T]], idempotent: bool) -> T:
+        self._stats["calls"] += 1
+        attempt = 0
+        while True:
+            queued_at = time.monotonic()
+            async with self._semaphore:
+                await self._take_token()
+                self._record_wait(time.monotonic() - queued_at)
+                self._in_flight += 1
+                try:
+                    result = await operation()
+                except Exception as exc:
+                    delay = self._retry_delay(self._classify_error(exc), idempotent, attempt)
+                    if delay is None:
+                        record_dependency_error(self.name)
+                        raise
+                    logger.info("%s call failed (%s), retrying in %.2fs", self.name, exc, delay)
+                else:
+                    delay = self._retry_delay(describe_http_failure(result), idempotent, attempt)
+                    if delay is None:
+                        if hasattr(result, "status_code"):
+                            annotate(status=result.status_code)
+                        if getattr(result, "status_code", 0) >= 400:
+                            record_dependency_error(self.name)
+                        return result
+                    logger.info(
+                        "%s returned HTTP %s, retrying in %.2fs", self.name, result.status_code, delay
+                    )
+                    await result.aclose()
+                finally:
+                    self._in_flight -= 1
+            self._stats["retries"] += 1
+            attempt += 1
+            annotate(retries=attempt)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        calls = self._stats["calls"]
+        stats = {key: value for key, value in self._stats.items() if key != "queue_wait_total"}
+        stats.update(
+            {
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "rate_per_second": self.rate,
+                "queue_wait_max": round(self._stats["queue_wait_max"], 4),
+                "queue_wait_avg": round(self._stats["queue_wait_total"] / calls, 4) if calls else None,
+            }
+        )
+        return stats
+
+    def _classify_error(self, exc: BaseException) -> Optional[Failure]:
+        if self._describe_error is not None:
+            failure = self._describe_error(exc)
+            if failure is not None:
+                return failure
+        return describe_http_failure(exc)
+
+    def _retry_delay(self, failure: Optional[Failure], idempotent: bool, attempt: int) -> Optional[float]:
+        if failure is None:
+            return None
+        if failure.status == 429:
+            self._stats["throttled"] += 1
+        elif failure.status is not None:
+            self._stats["server_errors"] += 1
+        retryable = failure.status == 429 or not failure.sent or idempotent
+        if not retryable:
+            return None
+        if attempt >= self.max_retries:
+            self._stats["gave_up"] += 1
+            return None
+        if failure.retry_after is not None:
+            if failure.retry_after > self.max_delay:
+                self._stats["gave_up"] += 1
+                return None
+            self._paused_until = max(self._paused_until, time.monotonic() + failure.retry_after)
+            return failure.retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    async def _take_token(self):
+        # The lock keeps waiters in arrival order while one of them sleeps for the next token.
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                if self.rate > 0:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                paused = self._paused_until - now
+                if paused > 0:
+                    await asyncio.sleep(paused)
+                    continue
+                if self.rate <= 0 or self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def _record_wait(self, seconds: float):
+        self._stats["queue_wait_total"] += seconds
+        self._stats["queue_wait_max"] = max(self._stats["queue_wait_max"], seconds)
+
+
+def get_rate_limit_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
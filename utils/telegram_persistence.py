@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+_USER = "user"
+_CHAT = "chat"
+_BOT = "bot"
+_CALLBACK = "callback"
+_CONVERSATION = "conversation:"
+
+_PendingKey = Tuple[str, str]
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    Stores user/chat/bot data and conversation states in a SQLite database (WAL mode).
+
+    The Application hands over changed entries once per update_interval; they are buffered
+    and written in a single transaction per persistence run instead of one write per entry.
+    Values are pickled, so anything kept in user_data must be picklable (as with PicklePersistence).
+    """
+
+    def __init__(self, path: str, update_interval: float = 60) -> None:
+        super().__init__(store_data=PersistenceInput(callback_data=False), update_interval=update_interval)
+        self._path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._pending: Dict[_PendingKey, Optional[bytes]] = {}
+        self._write_task: Optional[asyncio.Task] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self._path), check_same_thread=False, isolation_level=None)
+            os.chmod(self._path, 0o600)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bot_state ("
+                " kind TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " PRIMARY KEY (kind, key))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _load(self, kind: str) -> Dict[str, Any]:
+        with self._db_lock:
+            rows = self._connect().execute("SELECT key, value FROM bot_state WHERE kind = ?", (kind,)).fetchall()
+        loaded = {}
+        for key, value in rows:
+            try:
+                loaded[key] = pickle.loads(value)
+            except Exception as exc:
+                logger.warning("Dropping unreadable persisted %s entry %s: %s", kind, key, exc)
+        return loaded
+
+    def _write(self, batch: Dict[_PendingKey, Optional[bytes]]):
+        upserts = [(kind, key, value) for (kind, key), value in batch.items() if value is not None]
+        deletes = [(kind, key) for (kind, key), value in batch.items() if value is None]
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO bot_state (kind, key, value) VALUES (?, ?, ?)", upserts)
+                conn.executemany("DELETE FROM bot_state WHERE kind = ? AND key = ?", deletes)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _stage(self, kind: str, key: Any, value: Any = None, delete: bool = False):
+        self._pending[(kind, str(key))] = None if delete else pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if self._write_task is None or self._write_task.done():
+            # Every update_* call of one persistence run is already scheduled, so this task
+            # starts after all of them and writes the whole run at once.
+            self._write_task = asyncio.create_task(self._write_pending())
+
+    async def _write_pending(self):
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except sqlite3.Error as exc:
+            logger.error("Failed to persist %d bot state entries: %s", len(batch), exc)
+            # Keep them for the next run unless newer values arrived meanwhile.
+            self._pending = {**batch, **self._pending}
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        data = await asyncio.to_thread(self._load, _USER)
+        return defaultdict(dict, {int(key): value for key, value in data.items()})
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        data = await asyncio.to_thread(self._load, _CHAT)
+        return defaultdict(dict, {int(key): value for key, value in data.items()})
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        data = await asyncio.to_thread(self._load, _BOT)
+        return data.get("", {})
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> Dict[Tuple, object]:
+        data = await asyncio.to_thread(self._load, _CONVERSATION + name)
+        return {tuple(json.loads(key)): state for key, state in data.items()}
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        self._stage(_USER, user_id, data)
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        self._stage(_CHAT, chat_id, data)
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        self._stage(_BOT, "", data)
+
+    async def update_callback_data(self, data) -> None:
+        self._stage(_CALLBACK, "", data)
+
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]) -> None:
+        self._stage(_CONVERSATION + name, json.dumps(list(key)), new_state, delete=new_state is None)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._stage(_USER, user_id, delete=True)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._stage(_CHAT, chat_id, delete=True)
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def flush(self) -> None:
+        if self._write_task is not None:
+            await self._write_task
+        await self._write_pending()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,44 @@
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, TypeVar
+
+from utils.metrics import timed_stage
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """
+    Records wall-clock durations of named pipeline stages; concurrent stages overlap in the total.
+    Every stage run is also observed in the motobot_stage_duration_seconds histogram.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.stages: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            with timed_stage(name):
+                yield
+        finally:
+            self._record(name, time.perf_counter() - started)
+
+    async def track(self, name: str, awaitable: Awaitable[T]) -> T:
+        with self.stage(name):
+            return await awaitable
+
+    def total(self) -> float:
+        return time.perf_counter() - self._started
+
+    def summary(self) -> str:
+        parts = [f"{name}={seconds:.2f}s" for name, seconds in self.stages.items()]
+        parts.append(f"total={self.total():.2f}s")
+        return f"{self.name}: " + ", ".join(parts)
+
+    def _record(self, name: str, seconds: float):
+        # Parallel runs of the same stage (e.g. several uploads) report the slowest one.
+        self.stages[name] = max(self.stages.get(name, 0.0), seconds)
@@ -0,0 +1,182 @@
+import asyncio
+import contextvars
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from configs.config import TRACE_BUFFER_SIZE, TRACE_ENABLED, TRACE_EXPORT_PATH, TRACE_MAX_SPANS
+
+logger = logging.getLogger(__name__)
+
+_span_ids = itertools.count(1)
+_export_lock = threading.Lock()
+
+
+@dataclass
+class Span:
+    span_id: int
+    parent_id: Optional[int]
+    name: str
+    started_at: float
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self, trace_started_at: float) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.started_at - trace_started_at, 4),
+            "duration": round(self.duration, 4) if self.duration is not None else None,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    spans: List[Span] = field(default_factory=list)
+    dropped_spans: int = 0
+
+    def summary(self) -> Dict[str, Any]:
+        roots = [span for span in self.spans if span.parent_id is None]
+        return {
+            "trace_id": self.trace_id,
+            "name": roots[0].name if roots else None,
+            "started_at": self.started_at,
+            "duration": round(self.updated_at - self.started_at, 4),
+            "spans": len(self.spans),
+            "errors": sum(1 for span in self.spans if span.error),
+            "in_progress": any(span.duration is None for span in self.spans),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "dropped_spans": self.dropped_spans,
+            "span_list": [span.to_dict(self.started_at) for span in self.spans],
+        }
+
+
+@dataclass
+class _Active:
+    trace: Trace
+    span: Span
+
+
+_current: contextvars.ContextVar[Optional[_Active]] = contextvars.ContextVar("trace_span", default=None)
+
+
+class TraceBuffer:
+    """
+    Ring buffer of the most recent traces; a trace moves to the front whenever it gets a new span.
+    """
+
+    def __init__(self, max_traces: int) -> None:
+        self._max_traces = max(1, max_traces)
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+
+    def resume(self, trace_id: str) -> Trace:
+        trace = self._traces.get(trace_id)
+        if trace is None:
+            trace = self._traces[trace_id] = Trace(trace_id)
+            while len(self._traces) > self._max_traces:
+                self._traces.popitem(last=False)
+        else:
+            self._traces.move_to_end(trace_id)
+        return trace
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        return self._traces.get(trace_id)
+
+    def recent(self, limit: int) -> List[Trace]:
+        return list(reversed(self._traces.values()))[:limit]
+
+
+trace_buffer = TraceBuffer(TRACE_BUFFER_SIZE)
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Records a span nested under the current one. Outside a trace it starts (or resumes) trace_id;
+    without either it does nothing, so shared code can be instrumented unconditionally.
+    Tasks and threads started inside the block inherit it as their parent span.
+    """
+    parent = _current.get()
+    if parent is not None and trace_id and parent.trace.trace_id != trace_id:
+        parent = None  # a task inherited a span of another flow
+    if not TRACE_ENABLED or (parent is None and not trace_id):
+        yield None
+        return
+    trace = parent.trace if parent is not None else trace_buffer.resume(trace_id)
+    if len(trace.spans) >= TRACE_MAX_SPANS:
+        trace.dropped_spans += 1
+        yield None
+        return
+    current = Span(
+        span_id=next(_span_ids),
+        parent_id=parent.span.span_id if parent is not None else None,
+        name=name,
+        started_at=time.time(),
+        attributes=attributes,
+    )
+    trace.spans.append(current)
+    token = _current.set(_Active(trace, current))
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = type(exc).__name__ if isinstance(exc, asyncio.CancelledError) else repr(exc)
+        raise
+    finally:
+        _current.reset(token)
+        current.duration = time.time() - current.started_at
+        trace.updated_at = max(trace.updated_at, current.started_at + current.duration)
+        if parent is None and TRACE_EXPORT_PATH:
+            _export(trace, current)
+
+
+def annotate(**attributes: Any):
+    """
+    Adds attributes to the current span, if any.
+    """
+    active = _current.get()
+    if active is not None:
+        active.span.attributes.update(attributes)
+
+
+def _export(trace: Trace, root: Span):
+    # One line per top-level span (a handler run or a publish job) with everything nested under it.
+    ids = {root.span_id}
+    spans = []
+    for candidate in trace.spans:
+        if candidate.span_id in ids or candidate.parent_id in ids:
+            ids.add(candidate.span_id)
+            spans.append(candidate.to_dict(trace.started_at))
+    line = json.dumps({"trace_id": trace.trace_id, "trace_started_at": trace.started_at, "spans": spans})
+    try:
+        asyncio.get_running_loop().run_in_executor(None, _write_line, line)
+    except RuntimeError:
+        _write_line(line)
+
+
+def _write_line(line: str):
+    try:
+        path = Path(TRACE_EXPORT_PATH)
+        with _export_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+    except OSError as exc:
+        logger.warning("Trace export to %s failed: %s", TRACE_EXPORT_PATH, exc)
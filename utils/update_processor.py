@@ -0,0 +1,118 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates of the same user (or chat) one after another while different users run
+    in parallel, with at most max_concurrency updates being handled at once.
+
+    Later updates of an album skip the per-user queue: they are released as soon as the album's
+    first update starts, since that update waits for them to collect the whole album.
+    max_pending bounds how many updates may be queued or running in total.
+    """
+
+    def __init__(self, max_concurrency: int, max_pending: int) -> None:
+        super().__init__(max_concurrent_updates=max(max_pending, max_concurrency))
+        self._active = asyncio.BoundedSemaphore(max_concurrency)
+        self._max_concurrency = max_concurrency
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._depth: Dict[Hashable, int] = {}
+        self._albums: Dict[str, asyncio.Event] = {}
+        self._running = 0
+        self._stats = {
+            "processed": 0,
+            "queued": 0,
+            "album_bypasses": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "max_user_depth": 0,
+        }
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = _serialization_key(update)
+        album = _media_group_id(update)
+        queued_at = time.monotonic()
+        album_started = self._albums.get(album) if album is not None else None
+        if album_started is not None:
+            self._stats["album_bypasses"] += 1
+            await album_started.wait()
+            await self._run(coroutine, queued_at)
+            return
+        if key is None:
+            await self._run(coroutine, queued_at)
+            return
+
+        if album is not None:
+            album_started = self._albums[album] = asyncio.Event()
+        depth = self._depth[key] = self._depth.get(key, 0) + 1
+        if depth > 1:
+            self._stats["queued"] += 1
+            self._stats["max_user_depth"] = max(self._stats["max_user_depth"], depth)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                if album_started is not None:
+                    album_started.set()
+                await self._run(coroutine, queued_at)
+        finally:
+            if album is not None:
+                self._albums.pop(album, None)
+            self._depth[key] -= 1
+            if not self._depth[key]:
+                del self._depth[key]
+                del self._locks[key]
+
+    async def _run(self, coroutine: Awaitable[Any], queued_at: float):
+        async with self._active:
+            waited = time.monotonic() - queued_at
+            self._stats["wait_total"] += waited
+            self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+            self._running += 1
+            try:
+                await coroutine
+            finally:
+                self._running -= 1
+                self._stats["processed"] += 1
+
+    def stats(self) -> dict:
+        processed = self._stats["processed"]
+        waiting = {str(key): depth - 1 for key, depth in self._depth.items() if depth > 1}
+        return {
+            "running": self._running,
+            "max_concurrency": self._max_concurrency,
+            "processed": processed,
+            "queued": self._stats["queued"],
+            "album_bypasses": self._stats["album_bypasses"],
+            "users_active": len(self._depth),
+            "waiting_per_user": dict(sorted(waiting.items(), key=lambda item: -item[1])[:20]),
+            "max_user_depth": self._stats["max_user_depth"],
+            "wait_avg": round(self._stats["wait_total"] / processed, 4) if processed else None,
+            "wait_max": round(self._stats["wait_max"], 4),
+        }
+
+
+def _serialization_key(update: object) -> Optional[Hashable]:
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user:
+        return update.effective_user.id
+    if update.effective_chat:
+        return update.effective_chat.id
+    return None
+
+
+def _media_group_id(update: object) -> Optional[str]:
+    if isinstance(update, Update) and update.message:
+        return update.message.media_group_id
+    return None